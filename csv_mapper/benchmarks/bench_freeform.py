@@ -0,0 +1,77 @@
+# Throughput of the Freeform Text operation: the original row-wise
+# df.apply(template.format) against the compiled FreeformTemplate.
+#
+# Run from the csv_mapper directory:
+#     python -m benchmarks.bench_freeform [rows ...] [--legacy-max ROWS]
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.template import FreeformTemplate
+
+TEMPLATE = "{First Name} {Last Name} <{Email}> joined {Subscription Date} ({Index:>8})"
+
+
+def make_frame(rows):
+    ids = np.arange(rows)
+    return pd.DataFrame(
+        {
+            "Index": ids,
+            "First Name": pd.Series(ids % 5000).map("First{}".format),
+            "Last Name": pd.Series(ids % 7919).map("Last{}".format),
+            "Email": pd.Series(ids).map("user{}@example.com".format),
+            "Subscription Date": "2021-06-15",
+        }
+    )
+
+
+def legacy_render(df):
+    # Mirrors the code generated by MappingUI.add_operation
+    return df.apply(
+        lambda row: TEMPLATE.format(
+            **{
+                "First Name": row["First Name"],
+                "Last Name": row["Last Name"],
+                "Email": row["Email"],
+                "Subscription Date": row["Subscription Date"],
+                "Index": row["Index"],
+            }
+        ),
+        axis=1,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("rows", nargs="*", type=int, default=[1_000_000, 10_000_000])
+    parser.add_argument(
+        "--legacy-max",
+        type=int,
+        default=1_000_000,
+        help="largest row count to time the row-wise baseline on (it is slow)",
+    )
+    args = parser.parse_args()
+
+    template = FreeformTemplate(TEMPLATE)
+    for rows in args.rows:
+        df = make_frame(rows)
+        print(f"{rows:,} rows")
+
+        start = time.perf_counter()
+        rendered = template.render(df)
+        compiled = time.perf_counter() - start
+        print(f"  compiled {compiled:8.3f}s  {rows / compiled:12,.0f} rows/s")
+
+        if rows <= args.legacy_max:
+            start = time.perf_counter()
+            expected = legacy_render(df)
+            legacy = time.perf_counter() - start
+            assert rendered.equals(expected.astype(object))
+            print(f"  row-wise {legacy:8.3f}s  {rows / legacy:12,.0f} rows/s")
+            print(f"  speedup  {legacy / compiled:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
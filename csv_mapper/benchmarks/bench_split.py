@@ -0,0 +1,82 @@
+# Throughput of the Split operation: the original list column
+# (df[col].str.split(delimiter)) against the vectorized split into separate
+# columns, for plain object, Arrow-backed and categorical input columns.
+#
+# Run from the csv_mapper directory:
+#     python -m benchmarks.bench_split [rows ...] [--legacy-max ROWS]
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.split import split_columns
+
+DELIMITER = " "
+NAMES = ["First Name", "Last Name"]
+
+
+def make_series(rows):
+    ids = pd.Series(np.arange(rows))
+    return (ids % 5000).map("First{}".format) + DELIMITER + (ids % 7919).map("Last{}".format)
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def report(label, rows, seconds, baseline=None):
+    line = f"  {label:<22} {seconds:8.3f}s  {rows / seconds:12,.0f} rows/s"
+    if baseline:
+        line += f"  {baseline / seconds:6.1f}x"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("rows", nargs="*", type=int, default=[1_000_000, 10_000_000])
+    parser.add_argument(
+        "--legacy-max",
+        type=int,
+        default=1_000_000,
+        help="largest row count to time the list-column baseline on (it is slow)",
+    )
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        series = make_series(rows)
+        print(f"{rows:,} rows")
+
+        legacy = None
+        if rows <= args.legacy_max:
+            _, legacy = timed(lambda: series.str.split(DELIMITER))
+            report("list column", rows, legacy)
+
+        expected, seconds = timed(
+            lambda: series.str.split(DELIMITER, n=len(NAMES) - 1, expand=True)
+        )
+        report("pandas expand=True", rows, seconds, legacy)
+
+        columns, seconds = timed(lambda: split_columns(series, DELIMITER, len(NAMES)))
+        report("split (object)", rows, seconds, legacy)
+        for i, column in enumerate(columns):
+            assert column.astype(object).equals(expected[i].astype(object))
+        del expected, columns
+
+        typed = series.astype("string[pyarrow]")
+        _, seconds = timed(lambda: split_columns(typed, DELIMITER, len(NAMES)))
+        report("split (Arrow strings)", rows, seconds, legacy)
+        del typed
+
+        # Low-cardinality column (e.g. a status or region code)
+        categorical = pd.Series(
+            pd.Categorical.from_codes(np.arange(rows) % 5000, make_series(5000))
+        )
+        _, seconds = timed(lambda: split_columns(categorical, DELIMITER, len(NAMES)))
+        report("split (5k categories)", rows, seconds, legacy)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+# Benchmark suite for the load / transform / export paths, on synthetic
+# customer files shaped like customers-10000.csv (see src/config.py) at
+# several sizes and widths. Times CSVParser.load_csv and export_csv (read as
+# text and through a memory map), Transformation.apply for each operation
+# type, a headless run of a mapping using all of them (on each installed
+# backend) and the script generated from that mapping. Results are written
+# as JSON; --compare reports the cases that got slower than in an earlier
+# results file.
+#
+# Run from the csv_mapper directory:
+#     python -m benchmarks.suite [--rows N ...] [--widths N ...] [-o results.json]
+#     python -m benchmarks.suite --rows 10000 1000000 --compare baseline.json
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from src import pipeline
+from src.backends import available_backends, get_backend
+from src.csv_parser import CSVParser
+from src.mapping import Mapping
+from src.script import generate_script
+from src.transformation import Transformation
+
+DATA_VERSION = 1  # Bump when the generated data changes, so cached files are rebuilt
+GENERATE_CHUNK_ROWS = 500_000
+SEED = 20240615
+MIN_COMPARE_SECONDS = 0.01  # Shorter timings are mostly noise, so --compare skips them
+
+CUSTOMER_COLUMNS = [
+    "Index",
+    "Customer Id",
+    "First Name",
+    "Last Name",
+    "Company",
+    "City",
+    "Country",
+    "Phone 1",
+    "Phone 2",
+    "Email",
+    "Subscription Date",
+    "Website",
+]
+COUNTRIES = [
+    "Chile",
+    "Djibouti",
+    "Antigua and Barbuda",
+    "Dominican Republic",
+    "Slovakia",
+    "Bosnia and Herzegovina",
+    "Pitcairn Islands",
+    "Bulgaria",
+    "Cyprus",
+    "Timor-Leste",
+]
+
+# One operation of each type, written the way the UI's dialogs write them.
+# Together, in this order, they make up the mapping run end to end.
+OPERATIONS = {
+    "Filter": "df = df[(df['Country'] == 'Chile')]",
+    "Rename": "df = df.rename(columns={'Country': 'Customer Country'})",
+    "Combine": "df['Customer Name'] = df['First Name'].str.cat([df['Last Name']], sep=' ')",
+    "Split": (
+        "df[['Customer Mailbox', 'Customer Domain']] = df['Email'].str.split("
+        "'@', n=1, expand=True, regex=False).reindex(columns=range(2))"
+    ),
+    "Freeform Text": (
+        "template = '''{First Name} {Last Name} <{Email}> since {Subscription Date}'''\n"
+        "df['Customer Label'] = df.apply(lambda row: template.format("
+        "**{'First Name': row['First Name']}, **{'Last Name': row['Last Name']}, "
+        "**{'Email': row['Email']}, **{'Subscription Date': row['Subscription Date']}), axis=1)\n"
+    ),
+}
+# The input columns the operations read, and the columns exported by CSVParser
+OPERATION_COLUMNS = ["Index", "First Name", "Last Name", "Country", "Email", "Subscription Date"]
+EXPORT_COLUMNS = ["Index", "Customer Id", "First Name", "Last Name", "Email", "Country"]
+
+
+def dataset_path(data_dir, rows, width):
+    return os.path.join(data_dir, f"customers-{rows}x{width}-v{DATA_VERSION}.csv")
+
+
+def make_chunk(start, rows, width):
+    # Rows [start, start + rows) of the synthetic file; seeded by position so
+    # every file is reproducible and independent of the chunk size
+    rng = np.random.default_rng([SEED, start])
+    ids = np.arange(start, start + rows)
+    first = rng.integers(0, 5000, rows)
+    last = rng.integers(0, 7919, rows)
+    company = rng.integers(0, 20000, rows)
+    frame = pd.DataFrame(
+        {
+            "Index": ids + 1,
+            "Customer Id": pd.Series(ids).map("{:015X}".format),
+            "First Name": pd.Series(first).map("First{}".format),
+            "Last Name": pd.Series(last).map("Last{}".format),
+            "Company": pd.Series(company).map("Company {} Ltd".format),
+            "City": pd.Series(rng.integers(0, 3000, rows)).map("City{}".format),
+            "Country": np.array(COUNTRIES)[rng.integers(0, len(COUNTRIES), rows)],
+            "Phone 1": pd.Series(rng.integers(10**9, 10**10, rows)).map("+1-{}".format),
+            "Phone 2": pd.Series(rng.integers(10**9, 10**10, rows)).map("({})".format),
+            "Email": pd.Series(ids).map("customer{}@example.com".format),
+            "Subscription Date": (
+                pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 1000, rows), "D")
+            ).strftime("%Y-%m-%d"),
+            "Website": pd.Series(company).map("https://company{}.example.com/".format),
+        }
+    )
+    # Wider files pad with a mix of numeric and text columns
+    for extra in range(len(CUSTOMER_COLUMNS), width):
+        name = f"Field {extra + 1}"
+        if extra % 2:
+            frame[name] = rng.random(rows).round(4)
+        else:
+            frame[name] = pd.Series(rng.integers(0, 1000, rows)).map("value {}".format)
+    return frame
+
+
+def ensure_dataset(data_dir, rows, width):
+    # Generated once and reused by later runs
+    path = dataset_path(data_dir, rows, width)
+    if os.path.exists(path):
+        return path
+    os.makedirs(data_dir, exist_ok=True)
+    partial = path + ".tmp"
+    with open(partial, "w", newline="") as file:
+        for start in range(0, rows, GENERATE_CHUNK_ROWS):
+            chunk = make_chunk(start, min(GENERATE_CHUNK_ROWS, rows - start), width)
+            chunk.to_csv(file, index=False, header=start == 0)
+    os.replace(partial, path)
+    return path
+
+
+def benchmark_mapping(path):
+    transformation = Transformation("Customer")
+    for source in OPERATIONS.values():
+        transformation.add_operation(source)
+    return Mapping(
+        source_file=path,
+        mapped_columns=["Index", "Transformation: Customer"],
+        mappings={"Index": {"type": "passthrough"}, "Customer": transformation},
+        transformations={"Customer": transformation},
+    )
+
+
+def timed(function, repeat):
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        runs.append(time.perf_counter() - start)
+    return runs
+
+
+def run_dataset(path, rows, args, scratch):
+    # Yields (case, runs) for one input file; runs is None when the case is
+    # skipped
+    output_path = os.path.join(scratch, "output.csv")
+
+    if rows <= args.parser_max_rows:
+        yield "CSVParser.load_csv", timed(lambda: CSVParser(path), args.repeat)
+    else:
+        yield "CSVParser.load_csv", None  # Holds every row as Python lists
+
+    def export(memory_map=False):
+        parser = CSVParser(path, streaming=True, memory_map=memory_map)
+        parser.export_csv(output_path, EXPORT_COLUMNS)
+
+    yield "CSVParser.export_csv", timed(export, args.repeat)
+    yield "CSVParser.export_csv[memory_map]", timed(lambda: export(True), args.repeat)
+
+    # Each operation on its own, on a frame holding the columns they read
+    frame = pipeline.read_csv(path, usecols=OPERATION_COLUMNS)
+    for kind, source in OPERATIONS.items():
+        transformation = Transformation(kind)
+        transformation.add_operation(source)
+        yield f"Transformation.apply[{kind}]", timed(
+            lambda: transformation.apply(frame), args.repeat
+        )
+    del frame
+
+    mapping = benchmark_mapping(path)
+    yield "pipeline.run_mapping", timed(
+        lambda: pipeline.run_mapping(mapping, path, output_path), args.repeat
+    )
+    for name in available_backends():
+        if name != "pandas":
+            backend = get_backend(name)
+            yield f"backend[{name}]", timed(
+                lambda: backend.run_mapping(mapping, path, output_path), args.repeat
+            )
+
+    script_path = os.path.join(scratch, "transform.py")
+    with open(script_path, "w") as f:
+        f.write(generate_script(mapping, pipeline.read_header(path)))
+
+    def run_script():
+        subprocess.run(
+            [sys.executable, script_path, path, output_path],
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+
+    yield "generated script", timed(run_script, args.repeat)
+
+
+def environment():
+    info = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+    }
+    try:
+        import pyarrow
+
+        info["pyarrow"] = pyarrow.__version__
+    except ImportError:
+        info["pyarrow"] = None
+    try:
+        info["commit"] = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        info["commit"] = None
+    return info
+
+
+def compare(results, baseline_path, threshold):
+    # Prints the cases that got slower by more than threshold (a ratio) and
+    # returns how many did
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous = {
+        (result["dataset"], result["case"]): result["seconds"]
+        for result in baseline["results"]
+        if result["seconds"] is not None
+    }
+    regressions = 0
+    print(f"\nCompared with {baseline_path} ({baseline['environment'].get('commit')})")
+    for result in results:
+        before = previous.get((result["dataset"], result["case"]))
+        if before is None or result["seconds"] is None:
+            continue
+        if max(before, result["seconds"]) < MIN_COMPARE_SECONDS:
+            continue
+        ratio = result["seconds"] / before
+        flag = ""
+        if ratio > threshold:
+            flag = "  SLOWER"
+            regressions += 1
+        print(f"  {result['dataset']:<22} {result['case']:<36} {ratio:6.2f}x{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--rows", nargs="+", type=int, default=[10_000, 1_000_000, 10_000_000]
+    )
+    parser.add_argument(
+        "--widths",
+        nargs="+",
+        type=int,
+        default=[len(CUSTOMER_COLUMNS), 50],
+        help=f"columns per file; at least {len(CUSTOMER_COLUMNS)} (the customer columns)",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case; the best is kept")
+    parser.add_argument(
+        "--data-dir",
+        default=os.path.join(tempfile.gettempdir(), "csv_mapper_bench"),
+        help="where generated input files are kept between runs (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--parser-max-rows",
+        type=int,
+        default=1_000_000,
+        help="largest file loaded into memory by CSVParser.load_csv",
+    )
+    parser.add_argument("-o", "--output", default="benchmark-results.json")
+    parser.add_argument("--compare", help="earlier results JSON to compare against")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.2,
+        help="with --compare, report cases slower than this ratio (default: %(default)s)",
+    )
+    args = parser.parse_args()
+    if min(args.widths) < len(CUSTOMER_COLUMNS):
+        parser.error(f"--widths must be at least {len(CUSTOMER_COLUMNS)}")
+
+    results = []
+    with tempfile.TemporaryDirectory() as scratch:
+        for rows in args.rows:
+            for width in args.widths:
+                path = ensure_dataset(args.data_dir, rows, width)
+                dataset = f"{rows}x{width}"
+                print(f"{dataset} ({os.path.getsize(path) / 2**20:,.0f} MB)")
+                for case, runs in run_dataset(path, rows, args, scratch):
+                    seconds = min(runs) if runs else None
+                    results.append(
+                        {
+                            "dataset": dataset,
+                            "rows": rows,
+                            "columns": width,
+                            "case": case,
+                            "seconds": seconds,
+                            "runs": runs,
+                            "rows_per_second": rows / seconds if seconds else None,
+                        }
+                    )
+                    if seconds is None:
+                        print(f"  {case:<36} skipped")
+                    else:
+                        print(f"  {case:<36} {seconds:8.3f}s  {rows / seconds:12,.0f} rows/s")
+
+    with open(args.output, "w") as f:
+        json.dump({"environment": environment(), "results": results}, f, indent=2)
+    print(f"Results written to {args.output}")
+    if args.compare:
+        return 1 if compare(results, args.compare, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,289 @@
+import os
+from string import Formatter
+
+from .compiler import CombineOp, FilterOp, FreeformOp, RenameOp, SplitColumnsOp
+from .pipeline import OperationCancelled, run_mapping, select_target_columns
+from .profiling import profile_step
+
+try:
+    import polars as pl
+except ImportError:  # Optional: without it mappings only run on pandas
+    pl = None
+
+# Execution engines for headless runs of a mapping (input file to output
+# file). pandas runs every mapping; other backends run the mappings they can
+# translate and hand the rest to pandas, saying why in the run summary.
+
+DEFAULT_BACKEND = "pandas"
+
+# Strings pandas.read_csv reads as missing by default, so both engines agree
+# on which cells are missing
+PANDAS_NA_VALUES = [
+    "",
+    "#N/A",
+    "#N/A N/A",
+    "#NA",
+    "-1.#IND",
+    "-1.#QNAN",
+    "-NaN",
+    "-nan",
+    "1.#IND",
+    "1.#QNAN",
+    "<NA>",
+    "N/A",
+    "NA",
+    "NULL",
+    "NaN",
+    "None",
+    "n/a",
+    "nan",
+    "null",
+]
+POLARS_INFER_ROWS = 10000  # Rows Polars reads to decide the column types
+
+
+class UnsupportedMapping(Exception):
+    pass
+
+
+class PandasBackend:
+    name = "pandas"
+
+    def unsupported_reason(self, mapping):
+        return None
+
+    def run_mapping(
+        self, mapping, input_path, output_path, progress=None, is_cancelled=None, profiler=None
+    ):
+        summary = run_mapping(
+            mapping, input_path, output_path, progress, is_cancelled, profiler=profiler
+        )
+        summary["backend"] = self.name
+        return summary
+
+
+class PolarsBackend:
+    # Runs the optimized plan as one Polars lazy query that streams the file
+    # through all cores and writes the output as it goes. Handles Rename,
+    # Combine, Split (into columns), Filter (simple column tests) and
+    # Freeform Text (plain placeholders), with the same output as pandas.
+    # Progress is only reported when the query finishes, and a run can only
+    # be cancelled before it starts.
+    name = "polars"
+
+    def unsupported_reason(self, mapping):
+        if pl is None:
+            return "Polars is not installed"
+        try:
+            for operation in mapping.plan().operations:
+                _polars_step(operation)
+        except UnsupportedMapping as e:
+            return str(e)
+        return None
+
+    def run_mapping(
+        self, mapping, input_path, output_path, progress=None, is_cancelled=None, profiler=None
+    ):
+        reason = self.unsupported_reason(mapping)
+        if reason is None:
+            try:
+                return self._run(mapping, input_path, output_path, progress, is_cancelled, profiler)
+            except pl.exceptions.PolarsError as e:
+                # e.g. a column Polars typed differently from pandas
+                reason = f"Polars failed: {e}"
+        summary = PandasBackend().run_mapping(
+            mapping, input_path, output_path, progress, is_cancelled, profiler
+        )
+        summary["fallback"] = reason
+        return summary
+
+    def _run(self, mapping, input_path, output_path, progress, is_cancelled, profiler):
+        if is_cancelled is not None and is_cancelled():
+            raise OperationCancelled()
+        scan, rows_in = _scan_like_pandas(input_path)
+        query = scan
+        for operation in mapping.plan().operations:
+            query = _polars_step(operation)(query)
+        columns = query.collect_schema()
+        existing_columns, missing_columns = select_target_columns(
+            mapping.mapped_columns, list(mapping.transformations), columns.names()
+        )
+        query = query.select([_output_column(col, columns[col]) for col in existing_columns])
+
+        total = os.path.getsize(input_path)
+        with profile_step(profiler, "run", f"polars: {os.path.basename(input_path)}") as record:
+            rows_out = _write_batches(query, output_path)
+            record["rows_in"], record["rows_out"] = rows_in, rows_out
+        if progress:
+            progress("write", total, total)
+        summary = {
+            "input": input_path,
+            "output": output_path,
+            "rows_in": rows_in,
+            "rows_out": rows_out,
+            "columns": existing_columns,
+            "missing_columns": missing_columns,
+            "backend": self.name,
+        }
+        if profiler is not None:
+            summary["profile"] = profiler.to_dict()
+        return summary
+
+
+BACKENDS = {backend.name: backend for backend in (PandasBackend, PolarsBackend)}
+
+
+def get_backend(name=None):
+    name = name or DEFAULT_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend {name!r} (choose from {', '.join(BACKENDS)})")
+    return BACKENDS[name]()
+
+
+def available_backends():
+    # The backends whose engine is installed
+    return [name for name in BACKENDS if name != "polars" or pl is not None]
+
+
+def _scan_like_pandas(input_path):
+    # The file as a LazyFrame typed as pandas.read_csv types it, and its row
+    # count. pandas reads an integer column with missing values as float64
+    # (written as 3.0), so those columns are scanned as Float64; one pass
+    # counts their missing values together with the rows.
+    options = {"null_values": PANDAS_NA_VALUES, "infer_schema_length": POLARS_INFER_ROWS}
+    scan = pl.scan_csv(input_path, **options)
+    integers = [col for col, dtype in scan.collect_schema().items() if dtype.is_integer()]
+    counts = scan.select(pl.len(), *[pl.col(col).null_count() for col in integers])
+    rows, *nulls = counts.collect().row(0)
+    overrides = {col: pl.Float64 for col, missing in zip(integers, nulls) if missing}
+    if overrides:
+        scan = pl.scan_csv(input_path, schema_overrides=overrides, **options)
+    return scan, rows
+
+
+def _write_batches(query, output_path):
+    # Streams the query's result to the file batch by batch; returns the rows
+    with open(output_path, "wb") as file:
+        pl.DataFrame(schema=query.collect_schema()).write_csv(file)  # Header
+        rows = 0
+        for batch in query.collect_batches():
+            batch.write_csv(file, include_header=False)
+            rows += len(batch)
+    return rows
+
+
+def _polars_step(operation):
+    # The operation as a function of a LazyFrame
+    if isinstance(operation, RenameOp):
+        return lambda query: query.rename(operation.mapping, strict=False)
+    if isinstance(operation, CombineOp):
+        return _combine_step(operation)
+    if isinstance(operation, SplitColumnsOp):
+        return _split_step(operation)
+    if isinstance(operation, FilterOp):
+        if operation.mask is None:
+            raise UnsupportedMapping(f"Filter {operation.condition!r} is not a simple column test")
+        condition = _filter_expression(operation.mask.tree)
+        return lambda query: query.filter(condition)
+    if isinstance(operation, FreeformOp):
+        return _freeform_step(operation)
+    raise UnsupportedMapping(f"{operation.kind} operation {operation.describe()!r}")
+
+
+def _combine_step(operation):
+    columns = [pl.col(col).cast(pl.Utf8) for col in operation.columns]
+    if operation.null_policy == "empty":
+        columns = [column.fill_null("") for column in columns]
+    combined = pl.concat_str(
+        columns, separator=operation.separator, ignore_nulls=operation.null_policy == "skip"
+    )
+    return lambda query: query.with_columns(combined.alias(operation.new_name))
+
+
+def _split_step(operation):
+    fields = [f"field_{i}" for i in range(len(operation.new_names))]
+    parts = pl.col(operation.column).str.splitn(operation.delimiter, len(operation.new_names))
+    columns = [
+        parts.struct.field(field).alias(name) for field, name in zip(fields, operation.new_names)
+    ]
+    return lambda query: query.with_columns(columns)
+
+
+def _freeform_step(operation):
+    pieces = []  # Literal text, or the name of a column field
+    for literal, field_name, format_spec, conversion in Formatter().parse(operation.template):
+        if literal:
+            pieces.append(pl.lit(literal))
+        if field_name is None:
+            continue
+        if format_spec or conversion:
+            raise UnsupportedMapping(f"Freeform Text field {{{field_name}}} has a format")
+        pieces.append(field_name)
+
+    def step(query):
+        schema = query.collect_schema()
+        columns = [
+            piece if not isinstance(piece, str) else _text(pl.col(piece), schema[piece])
+            for piece in pieces
+        ]
+        rendered = pl.concat_str(columns) if columns else pl.lit("")
+        return query.with_columns(rendered.alias(operation.new_name))
+
+    return step
+
+
+def _text(column, dtype):
+    # A value as str.format renders it; missing values render as nan
+    if dtype == pl.Boolean:
+        column = _python_bool(column)
+    return column.cast(pl.Utf8).fill_null("nan")
+
+
+def _output_column(col, dtype):
+    # Written as pandas writes them: booleans as True/False, and empty text
+    # unquoted (Polars quotes it to tell it apart from a missing value)
+    column = pl.col(col)
+    if dtype == pl.Boolean:
+        return _python_bool(column).alias(col)
+    if dtype == pl.Utf8:
+        return pl.when(column != "").then(column).alias(col)
+    return column
+
+
+def _python_bool(column):
+    return pl.when(column).then(pl.lit("True")).when(column.not_()).then(pl.lit("False"))
+
+
+def _filter_expression(node):
+    # FilterMask tree to an expression. Missing values give the same answers
+    # as the pandas masks: False, except True for != (NaN != x).
+    kind = node[0]
+    if kind in ("and", "or"):
+        children = [_filter_expression(child) for child in node[1:]]
+        expression = children[0]
+        for child in children[1:]:
+            expression = expression & child if kind == "and" else expression | child
+        return expression
+    if kind == "not":
+        return ~_filter_expression(node[1])
+    column = pl.col(node[1])
+    if kind == "compare":
+        symbol, value = node[2], node[4]
+        result = node[3](column, pl.lit(value))
+        return result.fill_null(symbol == "!=")
+    if kind == "isin":
+        return column.is_in(node[2]).fill_null(False)
+    if kind == "null":
+        return column.is_not_null() if node[2] else column.is_null()
+    method, value, keywords = node[2], node[3], dict(node[4])
+    na = keywords.pop("na", False)
+    regex = keywords.pop("regex", True)
+    if keywords or not isinstance(value, str) or not isinstance(na, bool):
+        raise UnsupportedMapping(f"Filter test .str.{method}() with these arguments")
+    if method == "contains":
+        result = column.str.contains(value, literal=not regex)
+    elif method == "startswith":
+        result = column.str.starts_with(value)
+    else:
+        result = column.str.ends_with(value)
+    return result.fill_null(na)
@@ -0,0 +1,122 @@
+import hashlib
+import os
+
+import numpy as np
+
+from .config import CACHE_DIR, CACHE_MAX_BYTES
+
+try:
+    import pyarrow.feather as feather
+except ImportError:  # Optional: without pyarrow every lookup is a miss
+    feather = None
+
+
+HASH_SAMPLE_BYTES = 1024 * 1024  # Bytes hashed at each sampled offset
+HASH_SAMPLES = 16  # Offsets sampled across the file besides the head and tail
+
+
+def sample_digest(file_path, size, digest):
+    # Hashing every byte of a multi-GB file would cost as much as parsing
+    # it, so hash the head, the tail and evenly spaced blocks between, all
+    # within the first `size` bytes
+    with open(file_path, "rb") as file:
+        step = max(size // (HASH_SAMPLES + 1), 1)
+        offsets = [0] + [step * i for i in range(1, HASH_SAMPLES + 1)]
+        offsets.append(max(size - HASH_SAMPLE_BYTES, 0))
+        for offset in sorted(set(offsets)):
+            if offset >= size:
+                continue
+            file.seek(offset)
+            digest.update(file.read(min(HASH_SAMPLE_BYTES, size - offset)))
+    return digest
+
+
+class FrameCache:
+    # On-disk cache of parsed CSV files as uncompressed Feather (Arrow IPC)
+    # files, which are memory-mapped when read back. Entries are keyed by the
+    # source path, size, mtime and a hash of sampled content, so an edited
+    # file never hits a stale entry. Least recently used entries are evicted
+    # once the cache grows beyond max_bytes.
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    @property
+    def enabled(self):
+        return feather is not None and self.max_bytes > 0
+
+    def key(self, file_path):
+        stat = os.stat(file_path)
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(os.path.abspath(file_path).encode())
+        digest.update(f"{stat.st_size}:{stat.st_mtime_ns}".encode())
+        sample_digest(file_path, stat.st_size, digest)
+        return digest.hexdigest()
+
+    def entry_path(self, file_path):
+        return os.path.join(self.cache_dir, f"{self.key(file_path)}.feather")
+
+    def load(self, file_path, columns=None):
+        # Returns the cached frame (optionally only some columns), or None
+        if not self.enabled:
+            return None
+        entry = self.entry_path(file_path)
+        if not os.path.exists(entry):
+            return None
+        try:
+            table = feather.read_table(entry, columns=columns, memory_map=True)
+        except Exception:
+            os.remove(entry)  # Unreadable entry: drop it and parse again
+            return None
+        os.utime(entry)  # Mark as recently used
+        return _restore_missing(table.to_pandas())
+
+    def store(self, file_path, df):
+        if not self.enabled:
+            return False
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry = self.entry_path(file_path)
+        partial = f"{entry}.{os.getpid()}.tmp"
+        try:
+            feather.write_feather(
+                df.reset_index(drop=True), partial, compression="uncompressed"
+            )
+        except Exception:
+            # Columns Arrow can't represent (e.g. mixed-type objects) aren't cached
+            if os.path.exists(partial):
+                os.remove(partial)
+            return False
+        os.replace(partial, entry)
+        self.evict()
+        return True
+
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".feather"):
+                path = os.path.join(self.cache_dir, name)
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+
+    def clear(self):
+        if os.path.isdir(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(".feather"):
+                    os.remove(os.path.join(self.cache_dir, name))
+
+
+def _restore_missing(df):
+    # Arrow hands missing values in object columns back as None; read_csv
+    # gives NaN, which renders differently ("nan") in text operations
+    missing = {
+        column: df[column].fillna(np.nan)
+        for column in df.columns
+        if df[column].dtype == object and df[column].hasnans
+    }
+    return df.assign(**missing) if missing else df
@@ -0,0 +1,186 @@
+import argparse
+import glob
+import json
+import os
+import sys
+
+from .backends import BACKENDS, DEFAULT_BACKEND
+from .mapping import Mapping
+from .parallel import run_files
+from .pipeline import read_header
+
+# Headless batch runner for mappings saved from the UI. Does not import PyQt5.
+#
+#     python -m src.cli mapping.json data/*.csv -o out/ --workers 16
+#     python -m src.cli mapping.json customers.csv -o customers-transformed.csv
+
+PROFILE_STEPS_SHOWN = 3  # Slowest steps printed per file with --profile
+
+
+def expand_inputs(patterns):
+    # Accepts files, glob patterns and directories (all *.csv inside)
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = sorted(glob.glob(os.path.join(pattern, "*.csv")))
+        elif glob.has_magic(pattern):
+            matches = sorted(glob.glob(pattern, recursive=True))
+        else:
+            matches = [pattern]
+        for path in matches:
+            if path not in paths:
+                paths.append(path)
+    return paths
+
+
+def output_path_for(input_path, output, many, suffix):
+    # A single input may be written to an explicit file; otherwise the
+    # output is a directory and each result is named after its input
+    if not many and not os.path.isdir(output) and not output.endswith(os.sep):
+        return output
+    stem, ext = os.path.splitext(os.path.basename(input_path))
+    return os.path.join(output, f"{stem}{suffix}{ext or '.csv'}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m src.cli",
+        description="Apply a saved CSV mapping to one or more input files.",
+    )
+    parser.add_argument("mapping", help="mapping JSON saved from the CSV Mapper UI")
+    parser.add_argument("inputs", nargs="+", help="input CSV files, globs or directories")
+    parser.add_argument(
+        "-o", "--output", required=True, help="output file (single input) or directory"
+    )
+    parser.add_argument(
+        "--suffix",
+        default="-transformed",
+        help="appended to input file names when writing into a directory (default: %(default)s)",
+    )
+    parser.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=1,
+        help="worker processes, one file each; 0 uses every core (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--chunk-mb",
+        type=float,
+        help="split files larger than this many MB into chunks transformed on "
+        "separate workers (row-local operations only)",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="treat inputs as append-only logs: only transform rows added since the last "
+        "incremental run and append them to the existing outputs",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=list(BACKENDS),
+        default=DEFAULT_BACKEND,
+        help="engine that runs the mapping; polars streams each file on all cores and falls "
+        "back to pandas for operations it can't run; --incremental always runs on pandas "
+        "(default: %(default)s)",
+    )
+    parser.add_argument("--report", help="write the per-file timings and run summary as JSON")
+    parser.add_argument(
+        "--explain",
+        action="store_true",
+        help="print the optimized plan of the mapping for the first input and exit",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="PATH",
+        help="time each step (read, every operation, write) with its rows in/out and peak "
+        "memory growth, and write the per-file profiles as JSON",
+    )
+    return parser
+
+
+def print_result(summary):
+    if summary["error"] is not None:
+        print(f"{summary['input']}: failed: {summary['error']}", file=sys.stderr)
+        return
+    print(
+        f"{summary['input']} -> {summary['output']} "
+        f"({summary['rows_out']:,} rows, {summary['seconds']:.2f}s"
+        + (f", {summary['chunks']} chunks" if summary.get("chunks") else "")
+        + (f", {summary['mode']}" if summary.get("mode") else "")
+        + ")"
+    )
+    if summary.get("fallback"):
+        print(f"  ran on pandas: {summary['fallback']}", file=sys.stderr)
+    if summary["missing_columns"]:
+        print(
+            f"  missing columns: {', '.join(summary['missing_columns'])}",
+            file=sys.stderr,
+        )
+    if summary.get("profile"):
+        steps = sorted(summary["profile"]["steps"], key=lambda step: step["seconds"], reverse=True)
+        for step in steps[:PROFILE_STEPS_SHOWN]:
+            memory = step["peak_memory_delta"]
+            memory = f"{memory / 2**20:8.1f} MB" if memory is not None else " " * 11
+            print(f"  {step['seconds']:8.3f}s {memory}  {step['stage']}: {step['name']}")
+
+
+def print_report(report):
+    print(
+        f"{report['succeeded']}/{report['files']} files, "
+        f"{report['rows_in']:,} rows in, {report['rows_out']:,} rows out, "
+        f"{report['wall_seconds']:.2f}s wall ({report['busy_seconds']:.2f}s across "
+        f"{report['workers']} workers)"
+    )
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    mapping = Mapping.load(args.mapping)
+    inputs = expand_inputs(args.inputs)
+    if not inputs:
+        print("No input files matched.", file=sys.stderr)
+        return 1
+
+    if args.explain:
+        print(mapping.explain(read_header(inputs[0])))
+        return 0
+
+    many = len(inputs) > 1
+    if many or args.output.endswith(os.sep):
+        os.makedirs(args.output, exist_ok=True)
+
+    jobs = [
+        (input_path, output_path_for(input_path, args.output, many, args.suffix))
+        for input_path in inputs
+    ]
+    chunk_bytes = int(args.chunk_mb * 1024 * 1024) if args.chunk_mb else None
+    summaries, report = run_files(
+        mapping,
+        jobs,
+        workers=args.workers,
+        on_result=print_result,
+        chunk_bytes=chunk_bytes,
+        incremental=args.incremental,
+        profile=bool(args.profile),
+        backend=args.backend,
+    )
+    print_report(report)
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump({"summary": report, "files": summaries}, f, indent=2)
+    if args.profile:
+        profiles = [
+            {"input": s["input"], "output": s["output"], **s["profile"]}
+            for s in summaries
+            if s.get("profile")
+        ]
+        with open(args.profile, "w") as f:
+            json.dump({"files": profiles}, f, indent=2)
+    return 1 if report["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # Optional: without it columns are combined by pandas
+    pa = pc = None
+
+
+# What a missing value in any of the combined columns does to the result:
+#   "propagate" - the result is missing (as df['a'] + ' ' + df['b'])
+#   "skip"      - the value and its separator are left out
+#   "empty"     - the value counts as empty text
+NULL_POLICIES = ("propagate", "skip", "empty")
+
+ARROW_NULL_HANDLING = {"propagate": "emit_null", "skip": "skip", "empty": "replace"}
+
+
+def combine_columns(columns, separator, null_policy="propagate"):
+    # Joins the values of each row across the given Series with separator,
+    # in one pass over all the columns
+    if null_policy not in NULL_POLICIES:
+        raise ValueError(f"Unknown null policy {null_policy!r}")
+    if pc is not None:
+        try:
+            return _combine_arrow(columns, separator, null_policy)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            pass  # Not all strings: let pandas handle it
+    first, others = columns[0], list(columns[1:])
+    if null_policy == "skip":
+        values = [column.to_numpy(dtype=object) for column in columns]
+        joined = [
+            separator.join(str(value) for value in row if not pd.isna(value))
+            for row in zip(*values)
+        ]
+        return pd.Series(joined, index=first.index, dtype=object)
+    na_rep = "" if null_policy == "empty" else None
+    return first.str.cat(others, sep=separator, na_rep=na_rep)
+
+
+def _combine_arrow(columns, separator, null_policy):
+    arrays = []
+    for column in columns:
+        array = pa.array(column, from_pandas=True)
+        if isinstance(array, pa.ChunkedArray):
+            array = array.combine_chunks()  # Arrow-backed columns come chunked
+        if pa.types.is_dictionary(array.type):
+            array = array.dictionary_decode()  # Categoricals join as their values
+        if array.type not in (pa.string(), pa.large_string()):
+            raise pa.ArrowTypeError(f"cannot combine {array.type} values")
+        arrays.append(array.cast(pa.large_string()))
+    if null_policy == "skip":
+        # The skip kernel drops rows where every value is missing instead of
+        # emitting "", so give those rows an empty first value
+        all_missing = arrays[0].is_null()
+        for array in arrays[1:]:
+            all_missing = pc.and_(all_missing, array.is_null())
+        arrays[0] = pc.if_else(all_missing, pa.scalar("", pa.large_string()), arrays[0])
+    options = pc.JoinOptions(
+        null_handling=ARROW_NULL_HANDLING[null_policy], null_replacement=""
+    )
+    separator = pa.scalar(separator, pa.large_string())
+    joined = pc.binary_join_element_wise(*arrays, separator, options=options)
+    if len(joined) != len(arrays[0]):
+        raise pa.ArrowInvalid("joined length does not match the input")
+    return pd.Series(pd.arrays.ArrowStringArray(joined), index=columns[0].index)
@@ -0,0 +1,551 @@
+import ast
+from functools import lru_cache
+
+import pandas as pd
+
+from .combine import combine_columns
+from .filters import FilterMask
+from .split import split_columns
+from .template import FreeformTemplate
+
+
+class CompileError(ValueError):
+    pass
+
+
+def copy_on_write():
+    # Copy-on-write lets each operation's result share the unchanged column
+    # buffers of its input; only columns that are actually written get
+    # copied. It is only on while operations run, so pandas code elsewhere
+    # in the process keeps the default behaviour.
+    return pd.option_context("mode.copy_on_write", True)
+
+
+class Operation:
+    kind = "Code"
+    row_local = False  # Output rows depend only on the same input row
+
+    def __init__(self, source):
+        self.source = source
+        self.new_columns = []
+        self.columns_used = None  # Columns read by the operation; None if unknown
+
+    def apply(self, df):
+        raise NotImplementedError
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.describe()})"
+
+    def describe(self):
+        return self.source
+
+
+class RenameOp(Operation):
+    kind = "Rename"
+    row_local = True
+
+    def __init__(self, source, mapping):
+        super().__init__(source)
+        self.mapping = mapping
+        self.new_columns = list(mapping.values())
+        self.columns_used = list(mapping)
+
+    def apply(self, df):
+        return df.rename(columns=self.mapping)
+
+    def describe(self):
+        return ", ".join(f"{old} -> {new}" for old, new in self.mapping.items())
+
+
+class CombineOp(Operation):
+    kind = "Combine"
+    row_local = True
+
+    def __init__(self, source, new_name, columns, separator, null_policy="propagate"):
+        super().__init__(source)
+        self.new_name = new_name
+        self.columns = columns
+        self.separator = separator
+        self.null_policy = null_policy
+        self.new_columns = [new_name]
+        self.columns_used = list(columns)
+
+    def apply(self, df):
+        df[self.new_name] = combine_columns(
+            [df[col] for col in self.columns], self.separator, self.null_policy
+        )
+        return df
+
+    def describe(self):
+        nulls = "" if self.null_policy == "propagate" else f", nulls: {self.null_policy}"
+        columns = " + ".join(self.columns)
+        return f"{columns} (separator: {self.separator!r}{nulls}) -> {self.new_name}"
+
+
+class SplitOp(Operation):
+    kind = "Split"
+    row_local = True
+
+    def __init__(self, source, new_name, column, delimiter):
+        super().__init__(source)
+        self.new_name = new_name
+        self.column = column
+        self.delimiter = delimiter
+        self.new_columns = [new_name]
+        self.columns_used = [column]
+
+    def apply(self, df):
+        df[self.new_name] = df[self.column].str.split(self.delimiter)
+        return df
+
+    def describe(self):
+        return f"{self.column} (delimiter: {self.delimiter}) -> {self.new_name}"
+
+
+class SplitColumnsOp(Operation):
+    kind = "Split"
+    row_local = True
+
+    def __init__(self, source, new_names, column, delimiter):
+        super().__init__(source)
+        self.new_names = new_names
+        self.column = column
+        self.delimiter = delimiter
+        self.new_columns = list(new_names)
+        self.columns_used = [column]
+
+    def apply(self, df):
+        parts = split_columns(df[self.column], self.delimiter, len(self.new_names))
+        for name, part in zip(self.new_names, parts):
+            df[name] = part
+        return df
+
+    def describe(self):
+        return f"{self.column} (delimiter: {self.delimiter}) -> {', '.join(self.new_names)}"
+
+
+class FilterOp(Operation):
+    kind = "Filter"
+
+    def __init__(self, source, condition):
+        super().__init__(source)
+        self.condition = condition
+        self.code = compile(condition, "<filter>", "eval")
+        tree = ast.parse(condition, mode="eval")
+        self.columns_used = _referenced_columns(tree)
+        # Conditions like df['age'] > df['age'].mean() depend on other rows
+        self.row_local = _is_elementwise(tree)
+        # Simple column tests are fused into one mask; anything else is eval'd
+        self.mask = FilterMask.compile(condition)
+
+    def apply(self, df):
+        if self.mask is not None:
+            return df[self.mask.evaluate(df)]
+        return df[eval(self.code, {"pd": pd, "df": df})]
+
+    def describe(self):
+        return self.condition
+
+
+class FreeformOp(Operation):
+    kind = "Freeform Text"
+    row_local = True
+
+    def __init__(self, source, new_name, template):
+        super().__init__(source)
+        self.new_name = new_name
+        self.template = template
+        self.compiled_template = FreeformTemplate(template)
+        self.placeholders = self.compiled_template.columns
+        self.new_columns = [new_name]
+        self.columns_used = list(self.placeholders)
+
+    def apply(self, df):
+        df[self.new_name] = self.compiled_template.render(df)
+        return df
+
+    def describe(self):
+        return f"{self.new_name} = {self.template!r}"
+
+
+class AssignOp(Operation):
+    kind = "Assign"
+
+    def __init__(self, source, new_name, expression):
+        super().__init__(source)
+        self.new_name = new_name
+        self.expression = expression
+        self.code = compile(expression, "<operation>", "eval")
+        self.new_columns = [new_name]
+        self.columns_used = _referenced_columns(ast.parse(expression, mode="eval"))
+
+    def apply(self, df):
+        df[self.new_name] = eval(self.code, {"pd": pd, "df": df})
+        return df
+
+    def describe(self):
+        return f"{self.new_name} = {self.expression}"
+
+
+class CodeOp(Operation):
+    # Fallback for hand-written operations: the source is compiled once and
+    # executed in a single namespace so rebinding `df` is seen by the caller
+    def __init__(self, source, tree):
+        super().__init__(source)
+        self.code = compile(tree, "<operation>", "exec")
+        self.new_columns = _assigned_columns(tree)
+
+    def apply(self, df):
+        namespace = {"pd": pd, "df": df}
+        exec(self.code, namespace)
+        return namespace["df"]
+
+
+class CompiledPipeline:
+    def __init__(self, operations):
+        self.operations = operations
+
+    def run(self, df, profiler=None, label=None):
+        # With a Profiler, each operation is recorded as its own step
+        with copy_on_write():
+            for operation in self.operations:
+                if profiler is None:
+                    df = operation.apply(df)
+                    continue
+                name = f"{operation.kind}: {operation.describe()}"
+                if label:
+                    name = f"{label} / {name}"
+                with profiler.step("operation", name, rows_in=len(df)) as record:
+                    df = operation.apply(df)
+                    record["rows_out"] = len(df)
+        return df
+
+    def apply(self, df, profiler=None, label=None):
+        # Same contract as Transformation.apply: the caller's frame is untouched
+        with copy_on_write():
+            return self.run(df.copy(deep=False), profiler, label)
+
+    def __iter__(self):
+        return iter(self.operations)
+
+    def __len__(self):
+        return len(self.operations)
+
+
+def source_columns(operations):
+    # Walks compiled operations in order and returns the input columns they
+    # read, following renames back to the original name and ignoring columns
+    # created along the way. Returns None if any operation's use is unknown.
+    origins = {}  # Current column name -> input column, or None if created
+    needed = []
+    for operation in operations:
+        if operation.columns_used is None:
+            return None
+        for col in operation.columns_used:
+            origin = origins.get(col, col)
+            if origin is not None and origin not in needed:
+                needed.append(origin)
+        if isinstance(operation, RenameOp):
+            renamed = {new: origins.get(old, old) for old, new in operation.mapping.items()}
+            for old in operation.mapping:
+                origins[old] = None
+            origins.update(renamed)
+        else:
+            for col in operation.new_columns:
+                origins[col] = None
+    return needed
+
+
+@lru_cache(maxsize=1024)
+def compile_operation(source):
+    try:
+        tree = ast.parse(source.strip(), mode="exec")
+    except SyntaxError as e:
+        raise CompileError(f"Invalid operation {source!r}: {e.msg}") from e
+
+    operation = _match_operation(source, tree)
+    if operation is None:
+        operation = CodeOp(source, tree)
+    return operation
+
+
+def compile_operations(operations):
+    return CompiledPipeline(tuple(compile_operation(op) for op in operations))
+
+
+def _match_operation(source, tree):
+    body = tree.body
+    if len(body) == 2:
+        return _match_freeform(source, body)
+    if len(body) != 1 or not isinstance(body[0], ast.Assign) or len(body[0].targets) != 1:
+        return None
+
+    target, value = body[0].targets[0], body[0].value
+    if _is_df(target):
+        # df = df.rename(columns={...})
+        if (
+            isinstance(value, ast.Call)
+            and isinstance(value.func, ast.Attribute)
+            and _is_df(value.func.value)
+            and value.func.attr == "rename"
+            and not value.args
+            and len(value.keywords) == 1
+            and value.keywords[0].arg == "columns"
+        ):
+            mapping = _literal(value.keywords[0].value)
+            if isinstance(mapping, dict) and all(
+                isinstance(k, str) and isinstance(v, str) for k, v in mapping.items()
+            ):
+                return RenameOp(source, mapping)
+        # df = df[<condition>]
+        if isinstance(value, ast.Subscript) and _is_df(value.value):
+            if _column_name(value) is None:
+                return FilterOp(source, ast.unparse(value.slice))
+        return None
+
+    # df[['a', 'b']] = df['col'].str.split('delimiter', n=1, expand=True)...
+    new_names = _column_list(target)
+    if new_names:
+        split = _match_split_columns(value, len(new_names))
+        if split:
+            return SplitColumnsOp(source, new_names, *split)
+        return None
+
+    new_name = _column_name(target)
+    if new_name is None:
+        return None
+
+    for matcher in (_match_combine, _match_str_cat, _match_join):
+        combine = matcher(value)
+        if combine:
+            return CombineOp(source, new_name, *combine)
+
+    # df['x'] = df['col'].str.split('delimiter')
+    if (
+        isinstance(value, ast.Call)
+        and isinstance(value.func, ast.Attribute)
+        and value.func.attr == "split"
+        and isinstance(value.func.value, ast.Attribute)
+        and value.func.value.attr == "str"
+        and _column_name(value.func.value.value) is not None
+        and len(value.args) == 1
+        and not value.keywords
+        and isinstance(_literal(value.args[0]), str)
+    ):
+        return SplitOp(
+            source, new_name, _column_name(value.func.value.value), _literal(value.args[0])
+        )
+
+    return AssignOp(source, new_name, ast.unparse(value))
+
+
+def _match_split_columns(value, count):
+    # Returns (column, delimiter) for a literal split into exactly `count`
+    # (at least 2) columns, optionally padded with .reindex(columns=range(count)).
+    # pandas reads a delimiter as a regex unless regex=False or it is a
+    # single character, and n=0 means no limit, so other forms stay pandas code.
+    if count < 2:
+        return None
+    if (
+        isinstance(value, ast.Call)
+        and isinstance(value.func, ast.Attribute)
+        and value.func.attr == "reindex"
+    ):
+        keywords = {keyword.arg: keyword.value for keyword in value.keywords}
+        columns = keywords.get("columns")
+        if (
+            value.args
+            or list(keywords) != ["columns"]
+            or not isinstance(columns, ast.Call)
+            or ast.unparse(columns) != f"range({count})"
+        ):
+            return None
+        value = value.func.value
+    if not (
+        isinstance(value, ast.Call)
+        and isinstance(value.func, ast.Attribute)
+        and value.func.attr == "split"
+        and isinstance(value.func.value, ast.Attribute)
+        and value.func.value.attr == "str"
+        and len(value.args) == 1
+    ):
+        return None
+    column = _column_name(value.func.value.value)
+    delimiter = _literal(value.args[0])
+    keywords = {keyword.arg: _literal(keyword.value) for keyword in value.keywords}
+    if column is None or not isinstance(delimiter, str) or not delimiter:
+        return None
+    if keywords.pop("regex", None) is not False and len(delimiter) != 1:
+        return None
+    if keywords != {"n": count - 1, "expand": True}:
+        return None
+    return column, delimiter
+
+
+def _match_freeform(source, body):
+    # template = '''...'''
+    # df['x'] = df.apply(lambda row: template.format(...), axis=1)
+    first, second = body
+    if not (
+        isinstance(first, ast.Assign)
+        and len(first.targets) == 1
+        and isinstance(first.targets[0], ast.Name)
+        and first.targets[0].id == "template"
+        and isinstance(_literal(first.value), str)
+    ):
+        return None
+    if not (
+        isinstance(second, ast.Assign)
+        and len(second.targets) == 1
+        and _column_name(second.targets[0]) is not None
+        and isinstance(second.value, ast.Call)
+        and isinstance(second.value.func, ast.Attribute)
+        and _is_df(second.value.func.value)
+        and second.value.func.attr == "apply"
+    ):
+        return None
+    return FreeformOp(source, _column_name(second.targets[0]), _literal(first.value))
+
+
+def _match_combine(value):
+    # df['a'] + ' ' + df['b'] (+ ' ' + df['c'] ...)
+    terms = []
+    while isinstance(value, ast.BinOp) and isinstance(value.op, ast.Add):
+        terms.append(value.right)
+        value = value.left
+    terms.append(value)
+    terms.reverse()
+
+    if len(terms) < 3 or len(terms) % 2 == 0:
+        return None
+    columns = [_column_name(term) for term in terms[::2]]
+    separators = {_literal(term) for term in terms[1::2]}
+    if None in columns or len(separators) != 1:
+        return None
+    separator = separators.pop()
+    if not isinstance(separator, str):
+        return None
+    return columns, separator, "propagate"
+
+
+def _match_str_cat(value):
+    # df['a'].str.cat([df['b'], ...], sep=' '[, na_rep=''])
+    if not (
+        isinstance(value, ast.Call)
+        and isinstance(value.func, ast.Attribute)
+        and value.func.attr == "cat"
+        and isinstance(value.func.value, ast.Attribute)
+        and value.func.value.attr == "str"
+        and len(value.args) == 1
+        and isinstance(value.args[0], ast.List)
+    ):
+        return None
+    columns = [_column_name(value.func.value.value)]
+    columns += [_column_name(element) for element in value.args[0].elts]
+    keywords = {keyword.arg: _literal(keyword.value) for keyword in value.keywords}
+    separator = keywords.pop("sep", None)
+    null_policy = {(): "propagate", (("na_rep", ""),): "empty"}.get(tuple(keywords.items()))
+    if None in columns or not isinstance(separator, str) or null_policy is None:
+        return None
+    return columns, separator, null_policy
+
+
+def _match_join(value):
+    # df[['a', 'b', ...]].apply(lambda row: ' '.join(row.dropna().astype(str)), axis=1)
+    if not (
+        isinstance(value, ast.Call)
+        and isinstance(value.func, ast.Attribute)
+        and value.func.attr == "apply"
+        and value.args
+        and isinstance(value.args[0], ast.Lambda)
+        and isinstance(value.args[0].body, ast.Call)
+        and isinstance(value.args[0].body.func, ast.Attribute)
+    ):
+        return None
+    columns = _column_list(value.func.value)
+    separator = _literal(value.args[0].body.func.value)
+    if not columns or not isinstance(separator, str):
+        return None
+    expected = f"df[{columns!r}].apply(lambda row: {separator!r}.join(row.dropna().astype(str)), axis=1)"
+    if ast.unparse(value) != ast.unparse(ast.parse(expected, mode="eval").body):
+        return None
+    return columns, separator, "skip"
+
+
+def _is_df(node):
+    return isinstance(node, ast.Name) and node.id == "df"
+
+
+def _column_name(node):
+    # Returns 'col' for df['col'], otherwise None
+    if isinstance(node, ast.Subscript) and _is_df(node.value):
+        name = _literal(node.slice)
+        if isinstance(name, str):
+            return name
+    return None
+
+
+def _column_list(node):
+    # Returns ['a', 'b'] for df[['a', 'b']], otherwise None
+    if isinstance(node, ast.Subscript) and _is_df(node.value):
+        names = _literal(node.slice)
+        if isinstance(names, list) and names and all(isinstance(n, str) for n in names):
+            return names
+    return None
+
+
+def _literal(node):
+    try:
+        return ast.literal_eval(node)
+    except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+        return None
+
+
+# Series attributes and methods that work row by row
+ELEMENTWISE_ATTRIBUTES = {
+    "str", "dt", "contains", "startswith", "endswith", "match", "fullmatch",
+    "lower", "upper", "strip", "lstrip", "rstrip", "len", "isin", "between",
+    "isna", "notna", "isnull", "notnull", "fillna", "astype", "abs", "round",
+    "eq", "ne", "lt", "le", "gt", "ge", "year", "month", "day", "hour",
+    "minute", "second", "date", "weekday", "dayofweek",
+}
+
+
+def _is_elementwise(tree):
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Attribute) and node.attr not in ELEMENTWISE_ATTRIBUTES:
+            return False
+        if isinstance(node, ast.Call) and not isinstance(node.func, ast.Attribute):
+            return False
+        if isinstance(node, (ast.Lambda, ast.ListComp, ast.GeneratorExp, ast.DictComp)):
+            return False
+        if isinstance(node, ast.Subscript) and not _is_df(node.value):
+            return False
+    return True
+
+
+def _referenced_columns(tree):
+    # Columns read as df['col']; None if df is used any other way
+    columns = []
+    uses = 0
+    for node in ast.walk(tree):
+        if _is_df(node):
+            uses += 1
+        name = _column_name(node)
+        if name is not None:
+            uses -= 1
+            if name not in columns:
+                columns.append(name)
+    return columns if uses == 0 else None
+
+
+def _assigned_columns(tree):
+    columns = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Assign):
+            for target in node.targets:
+                names = _column_list(target) or [_column_name(target)]
+                columns.extend(
+                    name for name in names if name is not None and name not in columns
+                )
+    return columns
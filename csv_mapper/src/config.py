@@ -1,4 +1,9 @@
 # Configuration settings for CSV transformation
+import os
 
 INPUT_CSV_PATH = "customers-10000.csv"  # Replace with your input CSV path
 OUTPUT_CSV_PATH = "customers-10000-transformed.csv"  # Replace with your output CSV path
+
+# Columnar cache of parsed source files (needs pyarrow; disabled without it)
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "csv_mapper")
+CACHE_MAX_BYTES = 20 * 1024 ** 3  # Least recently used entries are evicted above this
@@ -1,45 +1,277 @@
 import pandas as pd
 import csv
+import io
+import os
+import random
+from itertools import islice
+from operator import itemgetter
+
+from .incremental import ByteRange, ExportState, complete_end, fingerprint, header_end
+from .mmap_reader import MappedCSVReader
+from .profiling import profile_step
+from .row_index import RowIndex
+
+
+DEFAULT_CHUNK_SIZE = 10000  # Rows read, mapped and written per batch when streaming
+DEFAULT_PREVIEW_ROWS = 1000  # Rows sampled for designing mappings
+
+
+class ProjectionPlan:
+    # Resolves the mapped columns against the header once so each row is
+    # remapped with a single itemgetter call instead of per-cell lookups
+    def __init__(self, header, mapped_columns, renames=None, default=''):
+        renames = renames or {}
+        self.width = len(header)
+        self.default = default
+        self.output_header = [renames.get(col, col) for col in mapped_columns]
+
+        positions = {}
+        for index, col in enumerate(header):
+            positions.setdefault(col, index)  # Match header.index(): first occurrence wins
+
+        # Missing columns point at a padding cell appended after the source fields
+        self.indices = [positions.get(col, self.width) for col in mapped_columns]
+        self.missing = [col for col in mapped_columns if col not in positions]
+        self.padding = (default,) if self.missing else ()
+
+        if len(self.indices) == 1:
+            index = self.indices[0]
+            self._getter = lambda row: (row[index],)
+        elif self.indices:
+            self._getter = itemgetter(*self.indices)
+        else:
+            self._getter = lambda row: ()
+
+    def project(self, row):
+        if len(row) != self.width:
+            # Ragged rows take the slow path: fields a short (or blank) row lacks
+            # are padded with the default, and a long row's extra fields are
+            # never mistaken for a missing column
+            width = min(len(row), self.width)
+            return tuple(row[index] if index < width else self.default for index in self.indices)
+        if self.padding:
+            return self._getter((*row, *self.padding))
+        return self._getter(row)
+
+    def project_rows(self, rows):
+        if self.padding:
+            return [self.project(row) for row in rows]
+        width = self.width
+        getter = self._getter
+        return [getter(row) if len(row) == width else self.project(row) for row in rows]
 
 
 class CSVParser:
-    def __init__(self, file_path=None):
+    def __init__(
+        self,
+        file_path=None,
+        streaming=False,
+        chunk_size=DEFAULT_CHUNK_SIZE,
+        usecols=None,
+        profiler=None,
+        memory_map=False,
+    ):
         self.header = []  # Initialize the header as an empty list
         self.data = []    # Initialize the data as an empty list
+        self.file_path = None
+        # Read rows lazily at export time instead of loading them
+        self.streaming = streaming or memory_map
+        self.memory_map = memory_map  # Export by copying the mapped fields out of a memory map
+        self.chunk_size = chunk_size
+        self.usecols = usecols  # Only keep these columns (None keeps all)
+        self._pruning_plan = None
+        self._row_index = None
+        self.rows_processed = 0  # Rows written by the current/last export
+        self.profiler = profiler  # Records each load and export when set
         if file_path:
             self.load_csv(file_path)
 
     def load_csv(self, file_path):
-        with open(file_path, 'r') as file:
+        with profile_step(self.profiler, "read", os.path.basename(file_path)) as record:
+            self._load_csv(file_path)
+            if not self.streaming:  # Streamed rows are only counted on export
+                record["rows_out"] = len(self.data)
+
+    def _load_csv(self, file_path):
+        self.file_path = file_path
+        self._row_index = None
+        with open(file_path, 'r', newline='') as file:
             csv_reader = csv.reader(file)
             self.header = next(csv_reader)  # Set the header
-            self.data = list(csv_reader)    # Set the data
+            self._source_header = self.header
+            if self.usecols is not None:
+                # Drop unused columns as rows are read so they are never kept
+                usecols = set(self.usecols)
+                kept = [col for col in self.header if col in usecols]
+                self._pruning_plan = ProjectionPlan(self.header, kept)
+                self.header = kept
+            if not self.streaming:
+                self.data = list(self._prune(csv_reader))    # Set the data
+
+    def _prune(self, rows):
+        if self._pruning_plan is None:
+            return rows
+        return map(self._pruning_plan.project, rows)
+
+    def iter_rows(self):
+        if not self.streaming:
+            yield from self.data
+            return
+
+        # Stream rows straight from disk so memory stays flat regardless of file size
+        with open(self.file_path, 'r', newline='') as file:
+            csv_reader = csv.reader(file)
+            next(csv_reader, None)  # Skip the header
+            yield from self._prune(csv_reader)
+
+    def iter_file_rows(self, start, end=None):
+        # Streams the rows in bytes [start, end) of the file; start must be
+        # the beginning of a row (e.g. just past the header)
+        with open(self.file_path, 'rb') as binary:
+            binary.seek(start)
+            file = io.TextIOWrapper(io.BufferedReader(ByteRange(binary, end)), newline='')
+            yield from self._prune(csv.reader(file))
+
+    def row_index(self, progress=None, is_cancelled=None):
+        # Offsets of every data row (see RowIndex), loaded or built on first use
+        if self._row_index is None:
+            self._row_index = RowIndex.open(self.file_path, progress, is_cancelled)
+        return self._row_index
+
+    def row_count(self):
+        return len(self.row_index())
+
+    def get_rows(self, start, count):
+        # Rows [start, start + count) of the file, read with a single seek
+        begin, end = self.row_index().span(start, start + count)
+        if begin == end:
+            return []
+        return list(self.iter_file_rows(begin, end))
+
+    def get_row(self, number):
+        rows = self.get_rows(number, 1)
+        if not rows or number < 0:
+            raise IndexError(f"Row {number} is out of range")
+        return rows[0]
+
+    def iter_chunks(self, chunk_size=None, rows=None):
+        chunk_size = chunk_size or self.chunk_size
+        rows = self.iter_rows() if rows is None else rows
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                return
+            yield chunk
 
     def get_columns(self):
-        if self.data is not None:
-            return list(self.data.columns)
-        return []
+        return list(self.header)
+
+    def get_preview(self, rows=5, sample=False, seed=None):
+        # Returns the header plus the first `rows` rows, or a uniform random
+        # sample of `rows` rows when sample=True, as a DataFrame parsed by
+        # pandas so the dtypes match a full pd.read_csv of the file
+        if not self.header:
+            return None
+        if sample:
+            selected = self._reservoir_sample(rows, seed)
+        elif self.streaming:
+            return pd.read_csv(self.file_path, nrows=rows, usecols=self.header)
+        else:
+            selected = self.data[:rows]
 
-    def get_preview(self, rows=5):
-        if self.data is not None:
-            return self.data.head(rows)
-        return None
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(self.header)
+        writer.writerows(selected)
+        buffer.seek(0)
+        return pd.read_csv(buffer)
 
-    def export_csv(self, export_path, mapped_columns):
+    def _reservoir_sample(self, rows, seed=None):
+        # One pass with memory bounded by `rows`; sampled rows keep file order
+        rng = random.Random(seed)
+        reservoir = []
+        for index, row in enumerate(self.iter_rows()):
+            if index < rows:
+                reservoir.append((index, row))
+            else:
+                slot = rng.randint(0, index)
+                if slot < rows:
+                    reservoir[slot] = (index, row)
+        reservoir.sort(key=lambda item: item[0])
+        return [row for _, row in reservoir]
+
+    def get_projection_plan(self, mapped_columns, renames=None):
+        return ProjectionPlan(self.header, mapped_columns, renames=renames)
+
+    def export_csv(
+        self, export_path, mapped_columns, progress_callback=None, renames=None, incremental=False
+    ):
+        # incremental treats the source as an append-only log: rows added
+        # since the last incremental export are appended to its output, which
+        # is rebuilt if the header, earlier rows or the output itself changed
+        with profile_step(self.profiler, "write", os.path.basename(export_path)) as record:
+            if incremental:
+                self._export_incremental(export_path, mapped_columns, progress_callback, renames)
+            elif self.memory_map:
+                self._export_mapped(export_path, mapped_columns, progress_callback, renames)
+            else:
+                self._write_rows(
+                    export_path, mapped_columns, self.iter_rows(), progress_callback, renames
+                )
+            record["rows_in"] = record["rows_out"] = self.rows_processed
+
+    def _export_mapped(self, export_path, mapped_columns, progress_callback, renames):
+        header = self._source_header
+        if self._pruning_plan is not None:
+            # Columns dropped by usecols export as missing, as they do from pruned rows
+            kept = set(self.header)
+            header = [col if col in kept else None for col in header]
+        plan = ProjectionPlan(header, mapped_columns, renames=renames)
+        with MappedCSVReader(self.file_path) as reader:
+            if reader.data_start is not None:
+                self.rows_processed = reader.export(export_path, plan, progress_callback)
+                return
+        self._write_rows(export_path, mapped_columns, self.iter_rows(), progress_callback, renames)
+
+    def _export_incremental(self, export_path, mapped_columns, progress_callback, renames):
+        state = ExportState(export_path)
+        key = fingerprint([mapped_columns, renames, self.usecols])
+        end = complete_end(self.file_path)
+        previous = state.load()
+        start = state.resume_offset(previous, self.file_path, key, end)
+        if start is None:
+            # Rebuild from just past the header
+            rows_before, start, append = 0, header_end(self.file_path) or end, False
+        else:
+            rows_before, append = previous["rows_in"], True
+        rows = self.iter_file_rows(start, end)
+        self._write_rows(
+            export_path, mapped_columns, rows, progress_callback, renames, append=append
+        )
+        total = rows_before + self.rows_processed
+        header = self.get_projection_plan(mapped_columns, renames=renames).output_header
+        state.record(self.file_path, key, end, total, total, header)
+
+    def _write_rows(
+        self, export_path, mapped_columns, rows, progress_callback=None, renames=None, append=False
+    ):
+        row = None
+        self.rows_processed = 0
+        plan = self.get_projection_plan(mapped_columns, renames=renames)
         try:
-            with open(export_path, 'w', newline='') as file:
+            with open(export_path, 'a' if append else 'w', newline='') as file:
                 writer = csv.writer(file)
-                writer.writerow(mapped_columns)  # Write the new header
-
-                for row in self.data:
-                    new_row = []
-                    for old_col in mapped_columns:
-                        if old_col in self.header:
-                            index = self.header.index(old_col)
-                            new_row.append(row[index])
-                        else:
-                            new_row.append('')  # or some default value
-                    writer.writerow(new_row)
+                if not append:
+                    writer.writerow(plan.output_header)  # Write the new header
+
+                for chunk in self.iter_chunks(rows=rows):
+                    row = chunk[0]
+                    writer.writerows(plan.project_rows(chunk))
+                    file.flush()  # Make each chunk visible on disk as soon as it is mapped
+
+                    self.rows_processed += len(chunk)
+                    if progress_callback:
+                        progress_callback(self.rows_processed)
 
         except Exception as e:
             print(f"Error processing row {row}: {str(e)}")
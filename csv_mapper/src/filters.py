@@ -0,0 +1,266 @@
+import ast
+import operator
+import re
+
+import numpy as np
+
+try:
+    import numexpr
+except ImportError:  # Optional: without it masks are fused with NumPy
+    numexpr = None
+
+
+# `df['col'] <op> value` as typed in the FilterDialog, for the operators
+# that are not valid pandas syntax
+DIALOG_CONDITION = re.compile(
+    r"""^\s*(?P<column>df\[(?:'[^']*'|"[^"]*")\])\s+"""
+    r"""(?P<op>not\s+in|in|contains|startswith|endswith)\s+(?P<value>.+?)\s*$""",
+    re.DOTALL,
+)
+
+COMPARISONS = {
+    ast.Eq: ("==", operator.eq),
+    ast.NotEq: ("!=", operator.ne),
+    ast.Gt: (">", operator.gt),
+    ast.GtE: (">=", operator.ge),
+    ast.Lt: ("<", operator.lt),
+    ast.LtE: ("<=", operator.le),
+}
+FLIPPED = {ast.Gt: ast.Lt, ast.GtE: ast.LtE, ast.Lt: ast.Gt, ast.LtE: ast.GtE}
+STRING_METHODS = {"contains", "startswith", "endswith"}
+NULL_METHODS = {"isna": False, "isnull": False, "notna": True, "notnull": True}
+
+
+def translate_condition(condition):
+    # Rewrites the dialog's in / not in / contains / startswith / endswith
+    # operators into the equivalent Series methods
+    match = DIALOG_CONDITION.match(condition)
+    if not match:
+        return condition
+    column, value = match.group("column"), match.group("value")
+    op = " ".join(match.group("op").split())
+    if op in ("in", "not in"):
+        try:
+            literal = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            literal = None
+        if isinstance(literal, tuple):
+            values = repr(list(literal))  # 40, 50 as well as (40, 50)
+        elif isinstance(literal, (list, set)):
+            values = value
+        else:
+            values = f"[{value}]"
+        negate = "~" if op == "not in" else ""
+        return f"{negate}{column}.isin({values})"
+    if op == "contains":
+        return f"{column}.str.contains({value}, regex=False, na=False)"
+    return f"{column}.str.{op}({value}, na=False)"
+
+
+class FilterMask:
+    # A filter condition parsed once into a tree of column tests joined by
+    # & | ~. Evaluating it produces one boolean mask: with numexpr installed
+    # the whole tree runs as a single fused expression; otherwise each test
+    # is combined into the mask in place, without pandas temporaries.
+    def __init__(self, condition, tree):
+        self.condition = condition
+        self.tree = tree
+
+    @classmethod
+    def compile(cls, condition):
+        # Returns None when the condition is not a combination of simple tests
+        try:
+            expression = ast.parse(condition.strip(), mode="eval").body
+        except SyntaxError:
+            return None
+        tree = _parse_node(expression)
+        if tree is None:
+            return None
+        return cls(condition, tree)
+
+    def evaluate(self, df):
+        if numexpr is not None:
+            variables = {}
+            expression = self._numexpr_expression(self.tree, df, variables)
+            return numexpr.evaluate(expression, local_dict=variables)
+        return self._evaluate(self.tree, df)
+
+    def _evaluate(self, node, df):
+        kind = node[0]
+        if kind in ("and", "or"):
+            mask = _writable(self._evaluate(node[1], df))
+            combine = np.logical_and if kind == "and" else np.logical_or
+            for child in node[2:]:
+                combine(mask, self._evaluate(child, df), out=mask)
+            return mask
+        if kind == "not":
+            mask = _writable(self._evaluate(node[1], df))
+            return np.logical_not(mask, out=mask)
+        return _evaluate_test(node, df)
+
+    def _numexpr_expression(self, node, df, variables):
+        kind = node[0]
+        if kind in ("and", "or"):
+            joiner = " & " if kind == "and" else " | "
+            return "(" + joiner.join(
+                self._numexpr_expression(child, df, variables) for child in node[1:]
+            ) + ")"
+        if kind == "not":
+            return "~(" + self._numexpr_expression(node[1], df, variables) + ")"
+
+        name = f"v{len(variables)}"
+        if kind == "compare":
+            _, column, symbol, _, value = node
+            values = df[column]
+            # numexpr handles plain numeric columns against numeric constants;
+            # anything else is evaluated up front and passed in as a mask
+            if (
+                isinstance(values.dtype, np.dtype)
+                and values.dtype.kind in "biuf"
+                and isinstance(value, (int, float))
+                and not isinstance(value, bool)
+            ):
+                variables[name] = values.to_numpy()
+                return f"({name} {symbol} {value!r})"
+        variables[name] = _evaluate_test(node, df)
+        return name
+
+    def describe(self):
+        return _describe(self.tree)
+
+
+def _parse_node(node):
+    if isinstance(node, ast.BinOp) and isinstance(node.op, (ast.BitAnd, ast.BitOr)):
+        kind = "and" if isinstance(node.op, ast.BitAnd) else "or"
+        left, right = _parse_node(node.left), _parse_node(node.right)
+        if left is None or right is None:
+            return None
+        # Flatten chains so a & b & c combines into one mask
+        children = []
+        for child in (left, right):
+            children.extend(child[1:] if child[0] == kind else [child])
+        return (kind, *children)
+    if isinstance(node, ast.BoolOp):
+        kind = "and" if isinstance(node.op, ast.And) else "or"
+        children = [_parse_node(value) for value in node.values]
+        if None in children:
+            return None
+        return (kind, *children)
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.Invert, ast.Not)):
+        operand = _parse_node(node.operand)
+        return None if operand is None else ("not", operand)
+    if isinstance(node, ast.Compare):
+        return _parse_compare(node)
+    if isinstance(node, ast.Call):
+        return _parse_call(node)
+    return None
+
+
+def _parse_compare(node):
+    if len(node.ops) != 1 or type(node.ops[0]) not in COMPARISONS:
+        return None
+    op, left, right = type(node.ops[0]), node.left, node.comparators[0]
+    column = _column(left)
+    if column is None:
+        # 30 < df['age'] reads as df['age'] > 30
+        column, left, right = _column(right), right, left
+        op = FLIPPED.get(op, op)
+    value = _literal(right)
+    if column is None or value is _MISSING or value is None:
+        # pandas compares nothing equal to None; NumPy would match None cells
+        return None
+    symbol, function = COMPARISONS[op]
+    return ("compare", column, symbol, function, value)
+
+
+def _parse_call(node):
+    func = node.func
+    if not isinstance(func, ast.Attribute):
+        return None
+    if func.attr == "isin":
+        column = _column(func.value)
+        values = _literal(node.args[0]) if len(node.args) == 1 and not node.keywords else _MISSING
+        if column is None or not isinstance(values, (list, tuple, set)):
+            return None
+        return ("isin", column, list(values))
+    if func.attr in NULL_METHODS:
+        column = _column(func.value)
+        if column is None or node.args or node.keywords:
+            return None
+        return ("null", column, NULL_METHODS[func.attr])
+    if func.attr in STRING_METHODS:
+        accessor = func.value
+        if not (isinstance(accessor, ast.Attribute) and accessor.attr == "str"):
+            return None
+        column = _column(accessor.value)
+        values = [_literal(arg) for arg in node.args]
+        keywords = {keyword.arg: _literal(keyword.value) for keyword in node.keywords}
+        if column is None or len(values) != 1 or _MISSING in values + list(keywords.values()):
+            return None
+        return ("str", column, func.attr, values[0], keywords)
+    return None
+
+
+def _evaluate_test(node, df):
+    kind, column = node[0], node[1]
+    series = df[column]
+    if kind == "compare":
+        function, value = node[3], node[4]
+        if isinstance(series.dtype, np.dtype):
+            return np.asarray(function(series.to_numpy(), value), dtype=bool)
+        # Extension dtypes (categorical, nullable, Arrow) compare natively; NA is False
+        return function(series, value).fillna(False).to_numpy(dtype=bool)
+    if kind == "isin":
+        return series.isin(node[2]).to_numpy(dtype=bool)
+    if kind == "null":
+        mask = _writable(series.isna().to_numpy(dtype=bool))
+        return np.logical_not(mask, out=mask) if node[2] else mask
+    if kind == "str":
+        method, value, keywords = node[2], node[3], dict(node[4])
+        keywords.setdefault("na", False)
+        result = getattr(series.str, method)(value, **keywords)
+        return result.fillna(False).to_numpy(dtype=bool)
+    raise ValueError(f"Unknown filter test {kind!r}")
+
+
+def _describe(node):
+    kind = node[0]
+    if kind in ("and", "or"):
+        joiner = " & " if kind == "and" else " | "
+        return "(" + joiner.join(_describe(child) for child in node[1:]) + ")"
+    if kind == "not":
+        return f"~{_describe(node[1])}"
+    if kind == "compare":
+        return f"(`{node[1]}` {node[2]} {node[4]!r})"
+    if kind == "isin":
+        return f"`{node[1]}` in {node[2]!r}"
+    if kind == "null":
+        return f"`{node[1]}`.{'notna' if node[2] else 'isna'}()"
+    return f"`{node[1]}`.str.{node[2]}({node[3]!r})"
+
+
+_MISSING = object()
+
+
+def _writable(mask):
+    # Masks from pandas may be read-only views; combine into a private copy
+    return mask if mask.flags.writeable else mask.copy()
+
+
+def _column(node):
+    if (
+        isinstance(node, ast.Subscript)
+        and isinstance(node.value, ast.Name)
+        and node.value.id == "df"
+    ):
+        name = _literal(node.slice)
+        if isinstance(name, str):
+            return name
+    return None
+
+
+def _literal(node):
+    try:
+        return ast.literal_eval(node)
+    except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+        return _MISSING
@@ -0,0 +1,138 @@
+import hashlib
+import io
+import json
+import os
+
+from .cache import sample_digest
+
+STATE_SUFFIX = ".state.json"  # Sidecar written next to an incremental export
+STATE_VERSION = 2
+
+
+class ByteRange(io.RawIOBase):
+    # Read-only view of an open binary file that stops at byte `end`, so a
+    # reader never sees a row that is still being appended
+    def __init__(self, file, end=None):
+        self._file = file
+        self._end = end
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        size = len(buffer)
+        if self._end is not None:
+            size = min(size, self._end - self._file.tell())
+        if size <= 0:
+            return 0
+        return self._file.readinto(memoryview(buffer)[:size])
+
+    def tell(self):
+        return self._file.tell()
+
+
+class ExportState:
+    # How much of an append-only source an export covers: the byte offset
+    # just past the last processed row, row counts, the column types the
+    # rows were read with, and fingerprints of the header and the bytes
+    # before the offset to detect rewritten input
+    def __init__(self, output_path):
+        self.output_path = output_path
+        self.path = output_path + STATE_SUFFIX
+
+    def load(self):
+        try:
+            with open(self.path, "r") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return state if state.get("version") == STATE_VERSION else None
+
+    def save(self, state):
+        partial = f"{self.path}.{os.getpid()}.tmp"
+        with open(partial, "w") as f:
+            json.dump({"version": STATE_VERSION, **state}, f, indent=2)
+        os.replace(partial, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def resume_offset(self, state, input_path, fingerprint, end):
+        # The offset to append from, or None when the output must be rebuilt
+        if state is None or state.get("fingerprint") != fingerprint:
+            return None
+        if state.get("input") != os.path.abspath(input_path):
+            return None
+        if not os.path.exists(self.output_path):
+            return None
+        if os.path.getsize(self.output_path) != state.get("output_bytes"):
+            return None  # Output edited or truncated since the last run
+        offset = state.get("offset", 0)
+        if offset > end or source_snapshot(input_path, offset) != {
+            key: state.get(key) for key in ("offset", "header", "prefix")
+        }:
+            return None  # Source shrank, or its header or earlier rows changed
+        if offset < end and not _ends_line(input_path, offset):
+            return None  # The last row had no newline and may have been continued
+        return offset
+
+    def record(self, input_path, fingerprint, offset, rows_in, rows_out, columns, dtypes=None):
+        self.save({
+            "input": os.path.abspath(input_path),
+            "fingerprint": fingerprint,
+            **source_snapshot(input_path, offset),
+            "rows_in": rows_in,
+            "rows_out": rows_out,
+            "columns": columns,
+            "dtypes": dtypes,
+            "output_bytes": os.path.getsize(self.output_path),
+        })
+
+
+def fingerprint(data):
+    # Stable hash of JSON-serializable settings (mapping, target columns...)
+    encoded = json.dumps(data, sort_keys=True, default=str).encode()
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+def source_snapshot(input_path, offset):
+    with open(input_path, "rb") as file:
+        header = file.readline()
+    digest = sample_digest(input_path, offset, hashlib.blake2b(digest_size=16))
+    return {
+        "offset": offset,
+        "header": hashlib.blake2b(header, digest_size=16).hexdigest(),
+        "prefix": digest.hexdigest(),
+    }
+
+
+def header_end(input_path):
+    with open(input_path, "rb") as file:
+        header = file.readline()
+    return len(header) if header.endswith(b"\n") else None
+
+
+def _ends_line(input_path, offset):
+    if offset == 0:
+        return True
+    with open(input_path, "rb") as file:
+        file.seek(offset - 1)
+        return file.read(1) == b"\n"
+
+
+def complete_end(input_path):
+    # Offset just past the last complete line; a trailing partial row that a
+    # writer is still appending is left for the next run
+    size = os.path.getsize(input_path)
+    with open(input_path, "rb") as file:
+        position = size
+        while position > 0:
+            start = max(position - 64 * 1024, 0)
+            file.seek(start)
+            block = file.read(position - start)
+            newline = block.rfind(b"\n")
+            if newline != -1:
+                return start + newline + 1
+            position = start
+    return 0
@@ -0,0 +1,128 @@
+import json
+
+from .plan import LogicalPlan
+from .schema import Schema
+from .transformation import Transformation
+
+
+class Mapping:
+    # A saved mapping: the target column list plus the transformations it
+    # uses, in the form written by MappingUI.save_mapping. Older files that
+    # only carry source_file and mapped_columns still load (as passthrough).
+    def __init__(
+        self, source_file="", mapped_columns=None, mappings=None, transformations=None, schema=None
+    ):
+        self.source_file = source_file
+        self.mapped_columns = mapped_columns or []  # Target list entries, in order
+        self.mappings = mappings or {}  # Source column/transformation name -> mapping
+        self.transformations = transformations or {}
+        self.schema = schema  # Storage types inferred from the source, if any
+
+    @classmethod
+    def from_dict(cls, data):
+        transformations = {}
+        for name, operations in data.get("transformations", {}).items():
+            transformation = Transformation(name)
+            for operation in operations:
+                transformation.add_operation(operation)
+            transformations[name] = transformation
+
+        mappings = {}
+        for source, entry in data.get("mappings", {}).items():
+            if entry.get("type") == "transformation":
+                mappings[source] = transformations[entry["name"]]
+            else:
+                mappings[source] = entry
+
+        return cls(
+            source_file=data.get("source_file", ""),
+            mapped_columns=data.get("mapped_columns", []),
+            mappings=mappings,
+            transformations=transformations,
+            schema=Schema.from_dict(data["schema"]) if data.get("schema") else None,
+        )
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r") as f:
+            return cls.from_dict(json.load(f))
+
+    def to_dict(self):
+        mappings = {}
+        for source, transform in self.mappings.items():
+            if isinstance(transform, Transformation):
+                mappings[source] = {"type": "transformation", "name": transform.name}
+            else:
+                mappings[source] = transform
+        data = {
+            "source_file": self.source_file,
+            "mapped_columns": self.mapped_columns,
+            "mappings": mappings,
+            "transformations": {
+                name: list(transformation.operations)
+                for name, transformation in self.transformations.items()
+            },
+        }
+        if self.schema is not None:
+            data["schema"] = self.schema.to_dict()
+        return data
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f)
+
+    def mapped_transformations(self):
+        return [
+            transform
+            for transform in self.mappings.values()
+            if isinstance(transform, Transformation)
+        ]
+
+    def is_row_local(self):
+        return all(transform.is_row_local() for transform in self.mapped_transformations())
+
+    def required_columns(self, header):
+        # The input columns the mapping actually reads, in header order, so
+        # readers can skip the rest. None when it can't be determined (an
+        # operation uses df in a way that isn't a plain df['col'] lookup).
+        needed = set()
+        for text in self.mapped_columns:
+            if text.startswith("Transformation: "):
+                # The export also picks up input columns named with the prefix
+                name = text.split(": ")[1]
+                needed.update(col for col in header if col.startswith(name))
+            else:
+                needed.add(text)
+
+        used = self.plan().input_columns()
+        if used is None:
+            return None
+        needed.update(used)
+        return [col for col in header if col in needed]
+
+    def operations(self):
+        # Every compiled operation of the mapped transformations, in run order
+        return [
+            operation
+            for transform in self.mapped_transformations()
+            for operation in transform.compile()
+        ]
+
+    def plan(self):
+        # The optimized operations of all mapped transformations (see LogicalPlan)
+        return LogicalPlan.from_mapping(self)
+
+    def plan_filters(self):
+        # Optimized run order split into the filters that can be applied while
+        # reading (they only read input columns) and the remaining operations
+        return self.plan().pipelines()
+
+    def storage_schema(self):
+        # The schema's types for the columns the optimized operations read the
+        # same way whatever their storage (see Schema.for_operations)
+        if self.schema is None:
+            return None
+        return self.schema.for_operations(self.plan().operations)
+
+    def explain(self, header=None):
+        return self.plan().explain(header)
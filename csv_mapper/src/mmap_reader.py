@@ -0,0 +1,260 @@
+import csv
+import io
+import locale
+import mmap
+
+import numpy as np
+
+BLOCK_BYTES = 16 * 1024 * 1024  # Rows indexed and exported per pass over the mapping
+
+NEWLINE, CARRIAGE_RETURN, COMMA, QUOTE = (ord(c) for c in '\n\r,"')
+
+
+class MappedCSVReader:
+    # Reads the data rows of a CSV through a memory map instead of decoding
+    # them into Python strings. Each block of rows is scanned with NumPy for
+    # the newlines and commas outside quoted fields by counting quote
+    # characters, as in parallel.split_byte_ranges. Counting is only right
+    # when every quote is where csv.reader gives it its quoting meaning (see
+    # _quotes_match_csv); a block with a literal quote inside an unquoted
+    # field (a"b) has its rows found by csv.reader instead. Field boundaries
+    # are only found for the exported columns of the block being written.
+    # Exported
+    # fields are copied byte for byte, which is what csv.writer would write
+    # for them, so no string is built for any field. A block that can't be
+    # copied exactly (ragged or blank rows, quotes in an exported field, a
+    # bare \r) goes through csv.reader and csv.writer like CSVParser's other
+    # paths.
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.encoding = locale.getpreferredencoding(False)  # What open() decodes with
+        self._file = open(file_path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._bytes = np.frombuffer(self._map, dtype=np.uint8)
+        except ValueError:  # Empty file
+            self._map = self._bytes = None
+        self.data_start = self._header_end()
+
+    def close(self):
+        self._bytes = None  # The NumPy view must go before the map can close
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _header_end(self):
+        # Offset just past the header row (which may hold quoted newlines), or
+        # None when the file ends its lines with a bare \r, which csv.reader
+        # reads but the block scan doesn't
+        if self._map is None:
+            return 0
+        in_quotes = False
+        position = 0
+        while True:
+            newline = self._map.find(b'\n', position)
+            if newline == -1:
+                position = len(self._map)
+                break
+            in_quotes ^= self._map[position:newline].count(b'"') % 2 == 1
+            position = newline + 1
+            if not in_quotes:
+                break
+        if b'\r' in self._map[:position].replace(b'\r\n', b''):
+            return None
+        return position
+
+    def iter_blocks(self, block_bytes=BLOCK_BYTES):
+        # Yields (starts, ends, next_starts, quotes) for blocks of whole rows:
+        # each row's start offset, the offset just past its last field (before
+        # \r\n or \n) and the start of the row after it (one past the end of
+        # the file for a last row without a newline), plus the offsets of the
+        # quote characters in the block. quotes is None for a block whose rows
+        # were found by csv.reader, which can't be copied field by field.
+        data = self._bytes
+        size = 0 if data is None else len(data)
+        position = self.data_start or 0
+        while position < size:
+            stop = min(position + block_bytes, size)
+            view = data[position:stop]
+            quotes = np.flatnonzero(view == QUOTE) + position
+            newlines = np.flatnonzero(view == NEWLINE)
+            # Rows start outside quotes, so a newline ends a row when an even
+            # number of quotes comes before it in the block
+            newlines = newlines[np.searchsorted(quotes, newlines + position) % 2 == 0]
+            if stop < size and not len(newlines):
+                if self._quotes_match_csv(quotes[:len(quotes) // 2 * 2]):
+                    block_bytes *= 2  # A row longer than the block
+                    continue
+                block = self._csv_block(position, block_bytes)
+            else:
+                if stop == size and (not len(newlines) or newlines[-1] != len(view) - 1):
+                    newlines = np.append(newlines, len(view))  # Last row has no newline
+                next_starts = newlines + position + 1
+                quotes = quotes[quotes < next_starts[-1] - 1]
+                if self._quotes_match_csv(quotes):
+                    block = _block(next_starts, position, data) + (quotes,)
+                else:
+                    block = self._csv_block(position, block_bytes)
+            yield block
+            position = int(block[2][-1])
+
+    def _quotes_match_csv(self, quotes):
+        # Whether csv.reader reads the quotes (offsets in the order found) the
+        # way counting them does: every opening quote starts a field or
+        # doubles the closing quote just before it, and every closing quote
+        # ends a field or is doubled by the quote just after it
+        data = self._bytes
+        openers, closers = quotes[0::2], quotes[1::2]
+        if len(closers) < len(openers):
+            return False  # A quoted field runs to the end of the file
+        before = data[openers - 1]
+        doubled = np.zeros(len(openers), dtype=bool)
+        doubled[1:] = closers[:-1] == openers[1:] - 1
+        if not ((before == COMMA) | (before == NEWLINE) | doubled).all():
+            return False
+        after = closers + 1
+        last = len(data) - 1
+        following = data[np.minimum(after, last)]
+        crlf = (following == CARRIAGE_RETURN) & (data[np.minimum(after + 1, last)] == NEWLINE)
+        ends_field = (after > last) | (following == COMMA) | (following == NEWLINE) | crlf
+        doubled = np.zeros(len(closers), dtype=bool)
+        doubled[:-1] = openers[1:] == after[:-1]
+        return bool((ends_field | doubled).all())
+
+    def _csv_block(self, position, block_bytes):
+        # The block of rows starting at `position` as csv.reader splits them,
+        # ending with the first row that reaches block_bytes past it
+        with open(self.file_path, 'rb') as binary:
+            binary.seek(position)
+            # Latin-1 decodes each byte to one character, so lengths are byte
+            # counts, and the delimiters are ASCII in the file's encoding too
+            lines = io.TextIOWrapper(binary, encoding='latin-1', newline='')
+            offset = position
+
+            def counted():
+                nonlocal offset
+                for line in lines:
+                    offset += len(line)
+                    yield line
+
+            next_starts = []
+            for _ in csv.reader(counted()):
+                next_starts.append(offset)
+                if offset >= position + block_bytes:
+                    break
+        next_starts = np.array(next_starts, dtype=np.int64)
+        if next_starts[-1] == len(self._bytes) and self._bytes[-1] != NEWLINE:
+            next_starts[-1] += 1  # Last row has no newline
+        return _block(next_starts, position, self._bytes) + (None,)
+
+    def export(self, export_path, plan, progress_callback=None):
+        # Writes plan.output_header and then every row projected by `plan` (a
+        # csv_parser.ProjectionPlan over the file's header). Returns the
+        # number of rows written.
+        rows_processed = 0
+        with open(export_path, 'w', newline='') as file:
+            csv.writer(file).writerow(plan.output_header)
+        with open(export_path, 'ab') as file:
+            for starts, ends, next_starts, quotes in self.iter_blocks():
+                output = self._copy_fields(starts, ends, quotes, plan)
+                rows = len(starts)
+                if output is None:
+                    output, rows = self._rewrite_rows(starts[0], next_starts[-1], plan)
+                file.write(output)
+                file.flush()  # Make each block visible on disk as soon as it is mapped
+                rows_processed += rows
+                if progress_callback:
+                    progress_callback(rows_processed)
+        return rows_processed
+
+    def _copy_fields(self, starts, ends, quotes, plan):
+        # The block's output as byte copies of the exported fields, or None
+        # when it has to go through the csv module
+        data = self._bytes
+        rows, width, indices = len(starts), plan.width, plan.indices
+        if quotes is None:
+            return None  # Rows csv.reader had to find
+        if (ends == starts).any():
+            return None  # Blank rows are read as [] by csv.reader
+        view = data[starts[0]:ends[-1]]
+        returns = np.flatnonzero(view == CARRIAGE_RETURN) + 1
+        if len(returns) and (returns[-1] == len(view) or (view[returns] != NEWLINE).any()):
+            return None  # csv.reader also ends rows at a bare \r
+        if not indices:
+            return b'\r\n' * rows
+
+        commas = np.flatnonzero(view == COMMA) + starts[0]
+        commas = commas[np.searchsorted(quotes, commas) % 2 == 0]
+        counts = np.bincount(np.searchsorted(ends, commas), minlength=rows)
+        if (counts != width - 1).any():
+            return None  # Ragged rows
+        commas = commas.reshape(rows, width - 1)
+
+        # Row-major (row, field) segments of the file to copy; missing
+        # columns are empty segments
+        empty = np.zeros(rows, dtype=np.int64)
+        field_starts = [
+            empty if index >= width else starts if index == 0 else commas[:, index - 1] + 1
+            for index in indices
+        ]
+        field_ends = [
+            empty if index >= width else ends if index == width - 1 else commas[:, index]
+            for index in indices
+        ]
+        sources = np.stack(field_starts, axis=1).ravel()
+        lengths = np.stack(field_ends, axis=1).ravel() - sources
+        if len(indices) == 1 and not lengths.all():
+            return None  # csv.writer writes a lone empty field as ""
+        if len(quotes) and (
+            np.searchsorted(quotes, sources + lengths) != np.searchsorted(quotes, sources)
+        ).any():
+            return None  # Quoted fields are written the way csv.writer quotes them
+
+        # Each field is followed by a comma, or \r\n after the last one
+        separators = np.ones((rows, len(indices)), dtype=np.int64)
+        separators[:, -1] = 2
+        separators = separators.ravel()
+        sizes = lengths + separators
+        targets = np.zeros(len(sources), dtype=np.int64)
+        targets[1:] = np.cumsum(sizes[:-1])
+        output = np.empty(int(sizes.sum()), dtype=np.uint8)
+
+        # Gather every copied byte at once: byte k of segment i goes from
+        # sources[i] + k to targets[i] + k
+        copied = np.zeros(len(sources), dtype=np.int64)
+        copied[1:] = np.cumsum(lengths[:-1])
+        steps = np.arange(int(lengths.sum()), dtype=np.int64)
+        output[np.repeat(targets - copied, lengths) + steps] = data[
+            np.repeat(sources - copied, lengths) + steps
+        ]
+        after = targets + lengths
+        last = separators == 2
+        output[after[~last]] = COMMA
+        output[after[last]] = CARRIAGE_RETURN
+        output[after[last] + 1] = NEWLINE
+        return output.tobytes()
+
+    def _rewrite_rows(self, start, end, plan):
+        # The block's output written by the csv module, and its row count
+        text = self._map[start:end].decode(self.encoding)
+        rows = plan.project_rows(csv.reader(io.StringIO(text, newline='')))
+        buffer = io.StringIO(newline='')
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue().encode(self.encoding), len(rows)
+
+
+def _block(next_starts, position, data):
+    # (starts, ends, next_starts) of the rows from `position` up to next_starts
+    starts = np.empty_like(next_starts)
+    starts[0] = position
+    starts[1:] = next_starts[:-1]
+    ends = next_starts - 1
+    has_return = (ends > starts) & (data[np.maximum(ends - 1, 0)] == CARRIAGE_RETURN)
+    ends[has_return] -= 1
+    return starts, ends, next_starts
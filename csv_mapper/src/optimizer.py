@@ -0,0 +1,142 @@
+from .compiler import (
+    AssignOp,
+    CombineOp,
+    FilterOp,
+    FreeformOp,
+    RenameOp,
+    SplitColumnsOp,
+    SplitOp,
+)
+
+# Operations that only add (or rename) columns: they can be dropped when
+# nothing reads what they write
+COLUMN_OPERATIONS = (AssignOp, CombineOp, FreeformOp, RenameOp, SplitColumnsOp, SplitOp)
+
+
+def push_down_filters(operations):
+    # Moves each Filter as early as it can go. A filter may move ahead of a
+    # row-local operation that neither creates nor renames a column the
+    # filter reads: every output row depends only on its own input row, so
+    # dropping rows first gives the same result with less work. Filters keep
+    # their relative order.
+    result = []
+    for operation in operations:
+        position = len(result)
+        if isinstance(operation, FilterOp) and operation.columns_used is not None:
+            while position > 0 and _can_move_before(operation, result[position - 1]):
+                position -= 1
+        result.insert(position, operation)
+    return result
+
+
+def eliminate_dead_columns(operations, is_target):
+    # Drops operations whose new columns are never exported (is_target) nor
+    # read by a later operation. Walks backwards tracking the columns still
+    # needed; an operation with unknown reads keeps everything before it.
+    # Returns the kept operations and the dropped ones.
+    live = set()
+    everything_live = False
+    kept = []
+    dropped = []
+    for operation in reversed(operations):
+        if not everything_live and _is_dead(operation, live, is_target):
+            dropped.append(operation)
+            continue
+        kept.append(operation)
+        if operation.columns_used is None:
+            everything_live = True
+            continue
+        if isinstance(operation, RenameOp):
+            # Only the columns whose new name is wanted are needed before it
+            needed = [
+                old
+                for old, new in operation.mapping.items()
+                if new in live or is_target(new)
+            ]
+            live.difference_update(operation.mapping.values())
+            live.update(needed)
+        else:
+            live.difference_update(operation.new_columns)
+            live.update(operation.columns_used)
+    return kept[::-1], dropped[::-1]
+
+
+def fuse_renames(operations):
+    # Replaces each run of consecutive renames with one rename of the
+    # composed mapping. Returns the operations and (runs, fused) pairs.
+    result = []
+    fused = []
+    for operation in operations:
+        previous = result[-1] if result else None
+        if not (isinstance(operation, RenameOp) and isinstance(previous, RenameOp)):
+            result.append(operation)
+            continue
+        mapping = {old: operation.mapping.get(new, new) for old, new in previous.mapping.items()}
+        for old, new in operation.mapping.items():
+            mapping.setdefault(old, new)
+        mapping = {old: new for old, new in mapping.items() if old != new}
+        combined = RenameOp(f"df = df.rename(columns={mapping!r})", mapping)
+        run = fused.pop()[0] if fused and fused[-1][1] is previous else [previous]
+        fused.append((run + [operation], combined))
+        result[-1] = combined
+    return result, fused
+
+
+def merge_filters(operations):
+    # Replaces adjacent filters with one filter on the combined condition,
+    # so the rows are masked and copied once. A filter can only join the one
+    # before it when it is row-local: evaluated on the rows the earlier
+    # filter would drop, it must give the same answer for the rows it keeps.
+    # Returns the operations and (filters, merged) pairs.
+    result = []
+    merged = []
+    for operation in operations:
+        previous = result[-1] if result else None
+        if not (
+            isinstance(operation, FilterOp)
+            and isinstance(previous, FilterOp)
+            and operation.row_local
+        ):
+            result.append(operation)
+            continue
+        condition = f"({previous.condition}) & ({operation.condition})"
+        combined = FilterOp(f"df = df[{condition}]", condition)
+        run = merged.pop()[0] if merged and merged[-1][1] is previous else [previous]
+        merged.append((run + [operation], combined))
+        result[-1] = combined
+    return result, merged
+
+
+def split_leading_filters(operations):
+    # Returns the row-local filters at the front of an (optimized) operation
+    # list, which only read input columns and can run on each chunk while the
+    # file is read, and the rest
+    leading = 0
+    while (
+        leading < len(operations)
+        and isinstance(operations[leading], FilterOp)
+        and operations[leading].row_local
+    ):
+        leading += 1
+    return operations[:leading], operations[leading:]
+
+
+def _can_move_before(filter_operation, earlier):
+    if isinstance(earlier, FilterOp):
+        return False
+    if not earlier.row_local or earlier.columns_used is None:
+        return False
+    touched = set(earlier.new_columns)
+    if isinstance(earlier, RenameOp):
+        touched.update(earlier.mapping)
+    return not touched.intersection(filter_operation.columns_used)
+
+
+def _is_dead(operation, live, is_target):
+    if not isinstance(operation, COLUMN_OPERATIONS) or not operation.new_columns:
+        return False
+    written = list(operation.new_columns)
+    if isinstance(operation, RenameOp):
+        # The old names disappear too, which matters if they are wanted
+        written.extend(operation.mapping)
+    return not any(col in live or is_target(col) for col in written)
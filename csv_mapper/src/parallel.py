@@ -0,0 +1,331 @@
+import io
+import os
+import shutil
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import pandas as pd
+
+from .backends import DEFAULT_BACKEND, get_backend
+from .mapping import Mapping
+from .pipeline import export_incremental, mapping_usecols, run_mapping, transform_frame
+from .profiling import Profiler, profile_step
+from .schema import common_dtypes
+
+
+SCAN_BLOCK_SIZE = 16 * 1024 * 1024  # Bytes read per step when locating chunk boundaries
+
+_worker_mapping = None  # Mapping rebuilt once per worker process
+
+
+def _init_worker(mapping_data):
+    global _worker_mapping
+    _worker_mapping = Mapping.from_dict(mapping_data)
+
+
+def _run_file(input_path, output_path, incremental=False, profile=False, backend=None):
+    start = time.perf_counter()
+    try:
+        if incremental:
+            run = export_incremental
+        elif backend and backend != DEFAULT_BACKEND:
+            run = get_backend(backend).run_mapping
+        else:
+            run = run_mapping
+        profiler = Profiler() if profile else None
+        summary = run(_worker_mapping, input_path, output_path, profiler=profiler)
+        summary["error"] = None
+    except Exception as e:
+        summary = {"input": input_path, "output": output_path, "error": str(e)}
+    summary["seconds"] = time.perf_counter() - start
+    return summary
+
+
+def _run_range(input_path, header_end, start, end, part_path, profile=False, dtypes=None):
+    # Transforms the rows in bytes [start, end) of the file and writes them,
+    # without a header, to part_path. The summary includes the dtypes the
+    # range was parsed with, even when the transform fails; dtypes forces
+    # them (see schema.common_dtypes).
+    started = time.perf_counter()
+    profiler = Profiler() if profile else None
+    parsed_dtypes = None
+    try:
+        with profile_step(profiler, "read", os.path.basename(input_path)) as record:
+            with open(input_path, "rb") as file:
+                header = file.read(header_end)
+                file.seek(start)
+                data = file.read(end - start)
+            header_columns = list(pd.read_csv(io.BytesIO(header), nrows=0).columns)
+            usecols = mapping_usecols(_worker_mapping, header_columns)
+            source_data = pd.read_csv(io.BytesIO(header + data), usecols=usecols, dtype=dtypes)
+            parsed_dtypes = {column: str(dtype) for column, dtype in source_data.dtypes.items()}
+            schema = _worker_mapping.storage_schema()
+            if schema is not None:
+                source_data = schema.apply(source_data)
+            record["rows_out"] = len(source_data)
+        output_data, missing_columns = transform_frame(
+            _worker_mapping, source_data, profiler=profiler
+        )
+        with profile_step(
+            profiler, "write", os.path.basename(part_path), rows_in=len(output_data)
+        ) as record:
+            output_data.to_csv(part_path, index=False, header=False)
+            record["rows_out"] = len(output_data)
+        summary = {
+            "rows_in": len(source_data),
+            "rows_out": len(output_data),
+            "columns": list(output_data.columns),
+            "missing_columns": missing_columns,
+            "dtypes": parsed_dtypes,
+            "forced": dtypes is not None,
+            "error": None,
+        }
+        if profiler is not None:
+            summary["profile"] = profiler.to_dict()
+    except Exception as e:
+        summary = {"dtypes": parsed_dtypes, "forced": dtypes is not None, "error": str(e)}
+    summary["part"] = part_path
+    summary["seconds"] = time.perf_counter() - started
+    return summary
+
+
+def split_byte_ranges(file_path, chunk_bytes):
+    # Splits the data rows of a CSV into [start, end) byte ranges of roughly
+    # chunk_bytes each. Boundaries fall just after a newline that is outside a
+    # quoted field; doubled quotes ("") keep the quote parity, so counting
+    # quote characters is enough to tell. Returns (header_end, ranges).
+    size = os.path.getsize(file_path)
+    boundaries = []
+    target = 0  # The first boundary found is the end of the header
+    in_quotes = False
+    with open(file_path, "rb") as file:
+        offset = 0  # File offset of block[0]
+        while True:
+            block = file.read(SCAN_BLOCK_SIZE)
+            if not block:
+                break
+            position = 0  # Quote state is known up to here
+            while target - offset < len(block):
+                # Bring the quote state forward to the target...
+                local_target = max(target - offset, position)
+                in_quotes ^= block.count(b'"', position, local_target) % 2 == 1
+                position = local_target
+                # ...then stop at the next newline outside quotes
+                newline = block.find(b"\n", position)
+                while newline != -1:
+                    in_quotes ^= block.count(b'"', position, newline) % 2 == 1
+                    position = newline + 1
+                    if not in_quotes:
+                        break
+                    newline = block.find(b"\n", position)
+                if newline == -1:
+                    break  # Keep looking in the next block
+                boundaries.append(offset + position)
+                target = offset + position + chunk_bytes
+            in_quotes ^= block.count(b'"', position) % 2 == 1
+            offset += len(block)
+
+    if not boundaries:
+        return size, []  # Header only, without a trailing newline
+    header_end = boundaries[0]
+    edges = [edge for edge in boundaries[1:] if edge < size] + [size]
+    ranges = []
+    start = header_end
+    for edge in edges:
+        if edge > start:
+            ranges.append((start, edge))
+            start = edge
+    return header_end, ranges
+
+
+def _ranges_to_rerun(part_summaries):
+    # The chunks whose parsed dtypes differ from the whole file's, with the
+    # dtypes to read them with, so every chunk is transformed alike. That
+    # includes chunks that failed because of their own dtypes (e.g. .str on a
+    # text column that is empty throughout the chunk, parsed as float64).
+    if any(part["dtypes"] is None for part in part_summaries):
+        return []  # A chunk couldn't be parsed, so neither can the file
+    common = common_dtypes(part["dtypes"] for part in part_summaries)
+    return [
+        (part, common)
+        for part in part_summaries
+        if part["dtypes"] != common and not part["forced"]
+    ]
+
+
+def _merge_parts(output_path, columns, part_summaries):
+    with open(output_path, "w", newline="") as output:
+        pd.DataFrame(columns=columns).to_csv(output, index=False)
+    with open(output_path, "ab") as output:
+        for part in part_summaries:
+            with open(part["part"], "rb") as part_file:
+                shutil.copyfileobj(part_file, output)
+
+
+def _file_summary(input_path, output_path, part_summaries):
+    # Combines the chunk results of one file and writes its output in order
+    started = time.perf_counter()
+    busy = sum(part["seconds"] for part in part_summaries)
+    errors = [part["error"] for part in part_summaries if part["error"] is not None]
+    try:
+        if errors:
+            raise RuntimeError(errors[0])
+        first = part_summaries[0]
+        _merge_parts(output_path, first["columns"], part_summaries)
+        summary = {
+            "input": input_path,
+            "output": output_path,
+            "rows_in": sum(part["rows_in"] for part in part_summaries),
+            "rows_out": sum(part["rows_out"] for part in part_summaries),
+            "columns": first["columns"],
+            "missing_columns": first["missing_columns"],
+            "chunks": len(part_summaries),
+            "error": None,
+        }
+        if "profile" in first:
+            summary["profile"] = _merge_profiles(part_summaries)
+    except Exception as e:
+        summary = {"input": input_path, "output": output_path, "error": str(e)}
+    finally:
+        for part in part_summaries:
+            if os.path.exists(part["part"]):
+                os.remove(part["part"])
+    summary["seconds"] = busy + time.perf_counter() - started
+    return summary
+
+
+def _merge_profiles(part_summaries):
+    # One profile for a chunked file; each step records the chunk it ran on
+    steps = []
+    for chunk, part in enumerate(part_summaries):
+        steps.extend(dict(step, chunk=chunk) for step in part["profile"]["steps"])
+    return {"total_seconds": sum(step["seconds"] for step in steps), "steps": steps}
+
+
+def _plan_tasks(jobs, chunk_bytes, incremental=False, profile=False, backend=None):
+    # Yields (file_index, function, args) tasks: whole files, or the byte
+    # ranges of a file when chunking is enabled
+    for index, (input_path, output_path) in enumerate(jobs):
+        ranges = []
+        if chunk_bytes and os.path.isfile(input_path):
+            header_end, ranges = split_byte_ranges(input_path, chunk_bytes)
+        if len(ranges) <= 1:
+            yield index, _run_file, (input_path, output_path, incremental, profile, backend)
+            continue
+        for part_index, (start, end) in enumerate(ranges):
+            part_path = f"{output_path}.part{part_index}"
+            yield index, _run_range, (input_path, header_end, start, end, part_path, profile, None)
+
+
+def run_files(
+    mapping,
+    jobs,
+    workers=1,
+    on_result=None,
+    chunk_bytes=None,
+    incremental=False,
+    profile=False,
+    backend=None,
+):
+    # Runs (input_path, output_path) jobs on a pool of worker processes. By
+    # default each task is one whole file. With chunk_bytes, each large file
+    # is split into newline-aligned byte ranges that are transformed on
+    # separate cores and concatenated in order. Chunks parsed with other
+    # dtypes than the whole file would have (a column with a missing value
+    # in just one chunk...) are run again with the file's dtypes. This only
+    # applies when every operation is row-local; other mappings fall back to
+    # whole files.
+    # With incremental, each output only gets the rows appended to its input
+    # since the last incremental run (see pipeline.export_incremental); those
+    # files are processed whole. With profile, each file summary includes the
+    # per-step profile of its run under "profile". backend names the engine
+    # that runs each whole file (see backends); engines other than pandas
+    # use every core themselves, so files aren't split into chunks for them.
+    # on_result is called with each file summary as it completes.
+    # Returns the per-file summaries (in job order) and a run report.
+    mapping_data = mapping.to_dict()  # Plain data pickles cheaply to workers
+    workers = workers or os.cpu_count() or 1
+    if incremental or (chunk_bytes and not mapping.is_row_local()):
+        chunk_bytes = None
+    if backend and backend != DEFAULT_BACKEND:
+        chunk_bytes = None
+    start = time.perf_counter()
+
+    tasks = list(_plan_tasks(jobs, chunk_bytes, incremental, profile, backend))
+    pending = {}  # file index -> number of unfinished tasks
+    for index, function, args in tasks:
+        pending[index] = pending.get(index, 0) + 1
+    parts = {index: [] for index in pending}
+    range_args = {args[4]: args for _, function, args in tasks if function is _run_range}
+    results = {}
+
+    def task_done(index, function, result, submit):
+        if function is _run_file:
+            results[index] = result
+        else:
+            parts[index].append(result)
+            pending[index] -= 1
+            if pending[index]:
+                return
+            rerun = _ranges_to_rerun(parts[index])
+            if rerun:
+                for part, dtypes in rerun:
+                    parts[index].remove(part)
+                    pending[index] += 1
+                    submit(index, _run_range, range_args[part["part"]][:-1] + (dtypes,))
+                return
+            input_path, output_path = jobs[index]
+            part_order = {f"{output_path}.part{i}": i for i in range(len(parts[index]))}
+            ordered = sorted(parts[index], key=lambda part: part_order[part["part"]])
+            results[index] = _file_summary(input_path, output_path, ordered)
+        if on_result:
+            on_result(results[index])
+
+    workers = max(min(workers, len(tasks)), 1)  # Processes actually used
+    if workers == 1:
+        _init_worker(mapping_data)
+        queue = list(tasks)
+
+        def run_later(index, function, args):
+            queue.append((index, function, args))
+
+        while queue:
+            index, function, args = queue.pop(0)
+            task_done(index, function, function(*args), run_later)
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(mapping_data,),
+        ) as executor:
+            futures = {}
+
+            def submit(index, function, args):
+                futures[executor.submit(function, *args)] = (index, function)
+
+            for index, function, args in tasks:
+                submit(index, function, args)
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, function = futures.pop(future)
+                    task_done(index, function, future.result(), submit)
+
+    summaries = [results[index] for index in range(len(jobs))]
+    return summaries, build_report(summaries, workers, time.perf_counter() - start)
+
+
+def build_report(summaries, workers, wall_seconds):
+    succeeded = [s for s in summaries if s["error"] is None]
+    busy_seconds = sum(s["seconds"] for s in summaries)
+    return {
+        "files": len(summaries),
+        "succeeded": len(succeeded),
+        "failed": len(summaries) - len(succeeded),
+        "workers": workers,
+        "rows_in": sum(s["rows_in"] for s in succeeded),
+        "rows_out": sum(s["rows_out"] for s in succeeded),
+        "wall_seconds": wall_seconds,
+        "busy_seconds": busy_seconds,  # Sum of per-file times across workers
+        "slowest": max(summaries, key=lambda s: s["seconds"])["input"] if summaries else None,
+    }
@@ -0,0 +1,370 @@
+import io
+import os
+
+import pandas as pd
+
+from .compiler import copy_on_write
+from .incremental import ByteRange, ExportState, complete_end, fingerprint, header_end
+from .profiling import profile_step
+from .schema import common_dtypes, concat_frames
+
+
+DEFAULT_CHUNK_ROWS = 100000  # Rows per read/write batch between progress reports
+
+
+class OperationCancelled(Exception):
+    pass
+
+
+class DtypesChanged(Exception):
+    # Rows being appended need other column types than the rows before them
+    pass
+
+
+def _check_cancelled(is_cancelled):
+    if is_cancelled is not None and is_cancelled():
+        raise OperationCancelled()
+
+
+def read_header(file_path):
+    return list(pd.read_csv(file_path, nrows=0).columns)
+
+
+def mapping_usecols(mapping, header):
+    # Columns to hand to the reader's usecols; None reads every column
+    usecols = mapping.required_columns(header)
+    if usecols is None or len(usecols) == len(header):
+        return None
+    return usecols
+
+
+def read_csv(
+    file_path,
+    chunk_size=DEFAULT_CHUNK_ROWS,
+    progress=None,
+    is_cancelled=None,
+    usecols=None,
+    row_filter=None,
+    cache=None,
+    schema=None,
+    start=None,
+    end=None,
+    profiler=None,
+):
+    # Reads in batches so progress (bytes read) can be reported and the load
+    # can be cancelled between batches. row_filter(chunk) may drop rows from
+    # each batch as it is read, so rejected rows are never held in memory.
+    # With a FrameCache, a previously parsed file is read back from the
+    # cache instead, and full unfiltered reads are stored in it. A Schema
+    # converts each batch to compact storage types as soon as it is parsed.
+    # start/end limit the read to the rows in bytes [start, end); start must
+    # be the beginning of a row. The header always comes from the first line.
+    with profile_step(profiler, "read", os.path.basename(file_path)) as record:
+        data = _read_csv(
+            file_path,
+            chunk_size,
+            progress,
+            is_cancelled,
+            usecols,
+            row_filter,
+            cache,
+            schema,
+            start,
+            end,
+        )
+        record["rows_out"] = len(data)
+    return data
+
+
+def _read_csv(
+    file_path, chunk_size, progress, is_cancelled, usecols, row_filter, cache, schema, start, end
+):
+    partial = start is not None or end is not None
+    total = os.path.getsize(file_path) if end is None else end
+    if cache is not None and not partial:
+        cached = cache.load(file_path, columns=usecols)
+        if cached is not None:
+            if progress:
+                progress("read", total, total)
+            if schema is not None:
+                cached = schema.apply(cached)
+            return row_filter(cached) if row_filter is not None else cached
+
+    chunks = []
+    header_options = {}
+    if start is not None:
+        header_options = {"header": None, "names": read_header(file_path)}
+    with open(file_path, "rb") as file:
+        if start is not None:
+            file.seek(start)
+        source = io.BufferedReader(ByteRange(file, end)) if partial else file
+        reader = pd.read_csv(source, chunksize=chunk_size, usecols=usecols, **header_options)
+        for chunk in reader:
+            if row_filter is not None:
+                chunk = row_filter(chunk)
+            if schema is not None:
+                chunk = schema.apply(chunk)
+            chunks.append(chunk)
+            _check_cancelled(is_cancelled)
+            if progress:
+                progress("read", file.tell() - (start or 0), total - (start or 0))
+
+    if not chunks:
+        # No rows: keep the column names
+        return pd.read_csv(file_path, usecols=usecols, nrows=0)
+    data = concat_frames(chunks)
+    if cache is not None and not partial and usecols is None and row_filter is None:
+        cache.store(file_path, data)
+    return data
+
+
+def apply_transformations(df, transformations, progress=None, is_cancelled=None, profiler=None):
+    with copy_on_write():
+        result = df.copy(deep=False)  # Column buffers stay shared until written
+        total = len(df) * len(transformations)
+        for done, transformation in enumerate(transformations, start=1):
+            _check_cancelled(is_cancelled)
+            result = transformation.apply(result, profiler=profiler)
+            if progress:
+                progress("transform", len(df) * done, total)
+    return result
+
+
+def select_target_columns(target_items, transformation_names, columns):
+    # Resolves the target list entries to the columns of the transformed data.
+    # Returns the columns to export and the targeted columns that are missing.
+    targeted_columns = []
+    for text in target_items:
+        if text.startswith("Transformation: "):
+            transform_name = text.split(": ")[1]
+            if transform_name in transformation_names:
+                targeted_columns.extend(
+                    [col for col in columns if col.startswith(transform_name)]
+                )
+        else:
+            targeted_columns.append(text)
+
+    # Remove duplicates while preserving order
+    targeted_columns = list(dict.fromkeys(targeted_columns))
+
+    existing_columns = [col for col in targeted_columns if col in columns]
+    missing_columns = [
+        col
+        for col in targeted_columns
+        if col not in existing_columns and not col.startswith("Transformation: ")
+    ]
+    return existing_columns, missing_columns
+
+
+def write_csv(
+    df,
+    export_path,
+    chunk_size=DEFAULT_CHUNK_ROWS,
+    progress=None,
+    is_cancelled=None,
+    append=False,
+    profiler=None,
+):
+    # append adds the rows, without a header, to the end of an existing export
+    with profile_step(profiler, "write", os.path.basename(export_path), rows_in=len(df)) as record:
+        _write_csv(df, export_path, chunk_size, progress, is_cancelled, append)
+        record["rows_out"] = len(df)
+
+
+def _write_csv(df, export_path, chunk_size, progress, is_cancelled, append):
+    total = len(df)
+    appended_at = os.path.getsize(export_path) if append else None
+    try:
+        with open(export_path, "a" if append else "w", newline="") as file:
+            if not append:
+                df.iloc[:0].to_csv(file, index=False)  # Header
+            for start in range(0, total, chunk_size):
+                _check_cancelled(is_cancelled)
+                df.iloc[start:start + chunk_size].to_csv(file, index=False, header=False)
+                if progress:
+                    progress("write", min(start + chunk_size, total), total)
+    except OperationCancelled:
+        # Don't leave a truncated export or half-appended rows behind
+        if append:
+            os.truncate(export_path, appended_at)
+        else:
+            os.remove(export_path)
+        raise
+
+
+def transform_frame(
+    mapping, source_data, progress=None, is_cancelled=None, prefiltered=False, profiler=None
+):
+    # Applies the mapping's operations, filters first where possible, and
+    # projects to its target columns. prefiltered means the leading filters
+    # already ran while reading. Returns the projected frame and the targeted
+    # columns that are missing.
+    leading_filters, remaining = mapping.plan_filters()
+    stages = [remaining] if prefiltered else [leading_filters, remaining]
+    transformed_data = apply_transformations(
+        source_data, [stage for stage in stages if len(stage)], progress, is_cancelled, profiler
+    )
+    with profile_step(profiler, "project", "target columns", rows_in=len(transformed_data)) as record:
+        existing_columns, missing_columns = select_target_columns(
+            mapping.mapped_columns, list(mapping.transformations), list(transformed_data.columns)
+        )
+        with copy_on_write():  # Selecting the columns doesn't copy them
+            output_data = transformed_data[existing_columns]
+        record["rows_out"] = len(output_data)
+    return output_data, missing_columns
+
+
+def run_mapping(
+    mapping,
+    input_path,
+    output_path,
+    progress=None,
+    is_cancelled=None,
+    start=None,
+    end=None,
+    profiler=None,
+    dtypes=None,
+):
+    # Load, transform, project and write one file headlessly.
+    # Returns a summary of the run. With start, only the rows in bytes
+    # [start, end) are processed and appended to the existing output.
+    # With a Profiler, the summary includes its steps under "profile"; the
+    # read step includes the leading filters, which run on each batch.
+    # The summary's "dtypes" are the types of the columns read, as the
+    # batches combine (see common_dtypes). dtypes are those of rows already
+    # exported: each batch is converted to them as pd.concat would, or
+    # DtypesChanged is raised before anything is written if they don't fit.
+    # Only parse the columns the mapping reads, and drop filtered-out rows
+    # batch by batch before any other operation runs on them
+    usecols = mapping_usecols(mapping, read_header(input_path))
+    leading_filters, _ = mapping.plan_filters()
+    rows_read = 0
+    read_dtypes = dtypes
+
+    def row_filter(chunk):
+        nonlocal rows_read, read_dtypes
+        rows_read += len(chunk)
+        parsed = {column: str(dtype) for column, dtype in chunk.dtypes.items()}
+        read_dtypes = common_dtypes([read_dtypes or parsed, parsed])
+        if dtypes is not None:
+            if read_dtypes != dtypes:
+                raise DtypesChanged()
+            chunk = chunk.astype(dtypes)
+        return leading_filters.run(chunk)
+
+    source_data = read_csv(
+        input_path,
+        progress=progress,
+        is_cancelled=is_cancelled,
+        usecols=usecols,
+        row_filter=row_filter,
+        schema=mapping.storage_schema(),
+        start=start,
+        end=end,
+        profiler=profiler,
+    )
+    if profiler is not None:
+        profiler.records[-1]["rows_in"] = rows_read
+    output_data, missing_columns = transform_frame(
+        mapping, source_data, progress, is_cancelled, prefiltered=True, profiler=profiler
+    )
+    write_csv(
+        output_data,
+        output_path,
+        progress=progress,
+        is_cancelled=is_cancelled,
+        append=start is not None,
+        profiler=profiler,
+    )
+    summary = {
+        "input": input_path,
+        "output": output_path,
+        "rows_in": rows_read,
+        "rows_out": len(output_data),
+        "columns": list(output_data.columns),
+        "missing_columns": missing_columns,
+        "dtypes": read_dtypes,
+    }
+    if profiler is not None:
+        summary["profile"] = profiler.to_dict()
+    return summary
+
+
+def mapping_fingerprint(mapping):
+    # What decides the output rows; the source path and the storage schema don't
+    data = mapping.to_dict()
+    return fingerprint({key: data[key] for key in ("mapped_columns", "mappings", "transformations")})
+
+
+def export_incremental(
+    mapping, input_path, output_path, progress=None, is_cancelled=None, profiler=None
+):
+    # For append-only sources: transforms only the rows added since the last
+    # run and appends them to the output, using the state file written next
+    # to it. Appended rows are read with the column types of the rows before
+    # them. The output is rebuilt in full when there is no usable state (the
+    # mapping, the source header or earlier bytes changed, or the output was
+    # modified), when the new rows change a column's type (e.g. the first
+    # missing value in an integer column) and always when an operation looks
+    # across rows (sorting, de-duplication...), since appended rows could
+    # change earlier output. A rebuild includes a last row without a newline;
+    # if the file grows after it, the next run rebuilds again.
+    state = ExportState(output_path)
+    key = mapping_fingerprint(mapping)
+    if not mapping.is_row_local() or header_end(input_path) is None:
+        state.clear()
+        summary = run_mapping(
+            mapping, input_path, output_path, progress, is_cancelled, profiler=profiler
+        )
+        summary["mode"] = "full"
+        return summary
+
+    previous = state.load()
+    size = os.path.getsize(input_path)
+    start = state.resume_offset(previous, input_path, key, size)
+    end = complete_end(input_path)
+    if start is not None and start >= end:
+        summary = {
+            "input": input_path,
+            "output": output_path,
+            "rows_in": 0,
+            "rows_out": 0,
+            "columns": previous["columns"],
+            "missing_columns": [],
+            "mode": "unchanged",
+        }
+        return summary
+
+    summary = None
+    if start is not None:
+        try:
+            summary = run_mapping(
+                mapping,
+                input_path,
+                output_path,
+                progress,
+                is_cancelled,
+                start=start,
+                end=end,
+                profiler=profiler,
+                dtypes=previous["dtypes"],
+            )
+        except DtypesChanged:
+            pass
+    if summary is None:
+        end = size
+        summary = run_mapping(
+            mapping, input_path, output_path, progress, is_cancelled, end=end, profiler=profiler
+        )
+        summary["mode"] = "full"
+        rows_in, rows_out = summary["rows_in"], summary["rows_out"]
+    else:
+        summary["mode"] = "append"
+        rows_in = previous["rows_in"] + summary["rows_in"]
+        rows_out = previous["rows_out"] + summary["rows_out"]
+
+    state.record(
+        input_path, key, end, rows_in, rows_out, summary["columns"], summary["dtypes"]
+    )
+    summary["total_rows_in"], summary["total_rows_out"] = rows_in, rows_out
+    return summary
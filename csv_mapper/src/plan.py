@@ -0,0 +1,107 @@
+from .compiler import CompiledPipeline, FilterOp, source_columns
+from .optimizer import (
+    eliminate_dead_columns,
+    fuse_renames,
+    merge_filters,
+    push_down_filters,
+    split_leading_filters,
+)
+
+
+class LogicalPlan:
+    # The operations of every mapped transformation as one list, rewritten
+    # before anything runs: operations whose columns never reach the target
+    # list are dropped, filters move as early as they can, consecutive
+    # renames become one rename and adjacent filters one filter. Nothing is
+    # executed until the plan is run (or split into pipelines by the reader).
+    def __init__(self, operations, is_target=None):
+        self.source_operations = list(operations)
+        self.dropped = []
+        self.fused = []  # (renames, fused rename) pairs
+        self.merged = []  # (filters, merged filter) pairs
+        operations = self.source_operations
+        if is_target is not None:
+            operations, self.dropped = eliminate_dead_columns(operations, is_target)
+        operations = push_down_filters(operations)
+        operations, self.fused = fuse_renames(operations)
+        operations, self.merged = merge_filters(operations)
+        self.leading_filters, self.remaining = split_leading_filters(operations)
+        self.operations = operations
+
+    @classmethod
+    def from_mapping(cls, mapping):
+        names = set()
+        prefixes = []
+        for text in mapping.mapped_columns:
+            if text.startswith("Transformation: "):
+                name = text.split(": ")[1]
+                if name in mapping.transformations:
+                    prefixes.append(name)
+            else:
+                names.add(text)
+        prefixes = tuple(prefixes)
+
+        def is_target(column):
+            # Mirrors pipeline.select_target_columns
+            return column in names or column.startswith(prefixes)
+
+        return cls(mapping.operations(), is_target)
+
+    def pipelines(self):
+        # The filters that can run on each chunk as it is read, and the rest
+        leading = CompiledPipeline(tuple(self.leading_filters))
+        return leading, CompiledPipeline(tuple(self.remaining))
+
+    def run(self, df, profiler=None):
+        leading, remaining = self.pipelines()
+        return remaining.run(leading.apply(df, profiler), profiler)
+
+    def input_columns(self):
+        # Input columns the optimized operations read; None if unknown
+        return source_columns(self.operations)
+
+    def explain(self, header=None):
+        # A readable account of the optimized plan and what was rewritten
+        lines = [
+            f"Optimized plan: {len(self.operations)} operations "
+            f"(from {len(self.source_operations)})"
+        ]
+        if header is not None:
+            columns = self.input_columns()
+            if columns is None:
+                lines.append(f"Operations may read any of the {len(header)} input columns")
+            else:
+                lines.append(f"Operations read: {', '.join(columns) or 'no input columns'}")
+        for index, operation in enumerate(self.operations, start=1):
+            where = " [while reading]" if index <= len(self.leading_filters) else ""
+            lines.append(f"  {index}. {operation.kind}: {operation.describe()}{where}")
+            details = []
+            if operation.columns_used is None:
+                details.append("reads: unknown")
+            elif operation.columns_used:
+                details.append(f"reads: {', '.join(operation.columns_used)}")
+            if operation.new_columns:
+                details.append(f"writes: {', '.join(operation.new_columns)}")
+            if not operation.row_local:
+                details.append("looks across rows")
+            if isinstance(operation, FilterOp) and operation.mask is None:
+                details.append("evaluated by pandas")
+            if details:
+                lines.append(f"     {'; '.join(details)}")
+        if self.dropped:
+            lines.append("Dropped (output never exported or read):")
+            lines.extend(
+                f"  - {operation.kind}: {operation.describe()}" for operation in self.dropped
+            )
+        if self.fused:
+            lines.append("Fused renames:")
+            lines.extend(
+                f"  - {len(renames)} renames -> {fused.describe()}" for renames, fused in self.fused
+            )
+        if self.merged:
+            lines.append("Merged filters:")
+            lines.extend(
+                f"  - {len(filters)} filters -> {merged.condition}"
+                for filters, merged in self.merged
+            )
+        return "\n".join(lines)
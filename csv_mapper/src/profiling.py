@@ -0,0 +1,92 @@
+import json
+import sys
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Not available on Windows: peak memory isn't reported
+    resource = None
+
+# Linux lets a process reset its resident-memory high-water mark, which gives
+# each step its own peak; elsewhere only growth of the process peak is seen
+CLEAR_REFS_PATH = "/proc/self/clear_refs"
+STATUS_PATH = "/proc/self/status"
+MAXRSS_UNIT = 1 if sys.platform == "darwin" else 1024  # ru_maxrss is in KB on Linux
+
+
+class Profiler:
+    # Records the wall time, rows in/out and peak memory growth of each step
+    # of a run (read, each operation, projection, write). Memory is the
+    # process's resident size, so it covers NumPy and Arrow buffers too and
+    # costs nothing to measure; peak_memory_delta is None where it can't be.
+    def __init__(self):
+        self.records = []
+
+    @contextmanager
+    def step(self, stage, name, rows_in=None):
+        # The caller may set record["rows_out"] before the block ends
+        record = {"stage": stage, "name": name, "rows_in": rows_in, "rows_out": None}
+        baseline = _start_peak()
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["seconds"] = time.perf_counter() - start
+            peak = _peak_rss()
+            record["peak_memory_delta"] = (
+                max(peak - baseline, 0) if peak is not None and baseline is not None else None
+            )
+            self.records.append(record)
+
+    def hottest(self, count=5):
+        return sorted(self.records, key=lambda record: record["seconds"], reverse=True)[:count]
+
+    def to_dict(self):
+        return {
+            "total_seconds": sum(record["seconds"] for record in self.records),
+            "steps": list(self.records),
+        }
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+
+@contextmanager
+def profile_step(profiler, stage, name, rows_in=None):
+    # Same as profiler.step, or a throwaway record when not profiling
+    if profiler is None:
+        yield {}
+        return
+    with profiler.step(stage, name, rows_in) as record:
+        yield record
+
+
+def _start_peak():
+    # Resets the high-water mark where possible and returns the size the
+    # step's peak is measured from
+    try:
+        with open(CLEAR_REFS_PATH, "w") as f:
+            f.write("5")
+        return _status_bytes("VmRSS")
+    except OSError:
+        return _peak_rss()
+
+
+def _peak_rss():
+    try:
+        return _status_bytes("VmHWM")
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * MAXRSS_UNIT
+
+
+def _status_bytes(field):
+    with open(STATUS_PATH) as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) * 1024  # Reported in kB
+    raise OSError(f"{field} not in {STATUS_PATH}")
@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from .config import CACHE_DIR
+from .mmap_reader import MappedCSVReader
+from .pipeline import OperationCancelled
+
+INDEX_SUFFIX = ".rowindex"  # Sidecar written next to the CSV
+INDEX_VERSION = 2  # 1 could split rows at a literal quote (a"b)
+
+
+class RowIndex:
+    # Byte offset of every data row of a CSV, so any row or window of rows is
+    # read with one seek. Built in one pass with MappedCSVReader's block scan
+    # and saved next to the CSV (or in CACHE_DIR when that folder is read-only)
+    # as a JSON line describing the source, followed by the offsets as
+    # little-endian uint64. The offsets are memory-mapped when loaded, so
+    # opening the index of a 50M-row file reads none of them. The size and
+    # mtime of the source are checked on load: an edited file is re-indexed.
+    def __init__(self, csv_path, offsets):
+        self.csv_path = csv_path
+        self.offsets = offsets  # Start of each row, then the end of the last one
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def span(self, start, stop):
+        # Byte range [begin, end) holding rows [start, stop), clipped to the file
+        rows = len(self)
+        start = min(max(start, 0), rows)
+        stop = min(max(stop, start), rows)
+        return int(self.offsets[start]), int(self.offsets[stop])
+
+    @classmethod
+    def open(cls, csv_path, progress=None, is_cancelled=None):
+        # The saved index if it is still current, else a freshly built one
+        index = cls.load(csv_path)
+        if index is None:
+            index = cls.build(csv_path, progress, is_cancelled)
+        return index
+
+    @classmethod
+    def load(cls, csv_path):
+        stat = os.stat(csv_path)
+        for path in index_paths(csv_path):
+            try:
+                with open(path, "rb") as f:
+                    line = f.readline()
+                info = json.loads(line)
+            except (OSError, ValueError):
+                continue
+            if info.get("version") != INDEX_VERSION or info.get("source") != _source(stat):
+                continue
+            offsets = np.memmap(path, dtype="<u8", mode="r", offset=len(line))
+            if len(offsets) == info.get("rows", -1) + 1:
+                return cls(csv_path, offsets)
+        return None
+
+    @classmethod
+    def build(cls, csv_path, progress=None, is_cancelled=None):
+        stat = os.stat(csv_path)
+        for path in index_paths(csv_path):
+            partial = f"{path}.{os.getpid()}.tmp"
+            try:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                with open(partial, "wb") as f:
+                    rows = _write_offsets(csv_path, f, stat.st_size, progress, is_cancelled)
+                    f.seek(0)
+                    f.write(_header_line(stat, rows))
+                os.replace(partial, path)
+            except OSError:
+                if os.path.exists(partial):
+                    os.remove(partial)
+                continue
+            except BaseException:
+                os.remove(partial)
+                raise
+            return cls.load(csv_path)
+        raise OSError(f"Nowhere to save the row index of {csv_path}")
+
+
+def index_paths(csv_path):
+    # Next to the CSV first, then in the cache folder
+    name = hashlib.blake2b(os.path.abspath(csv_path).encode(), digest_size=16).hexdigest()
+    return [csv_path + INDEX_SUFFIX, os.path.join(CACHE_DIR, name + INDEX_SUFFIX)]
+
+
+def _source(stat):
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _header_line(stat, rows):
+    # Padded to a fixed width so it can be written after the offsets
+    line = json.dumps({"version": INDEX_VERSION, "source": _source(stat), "rows": rows})
+    return line.ljust(255).encode() + b"\n"
+
+
+def _write_offsets(csv_path, file, size, progress, is_cancelled):
+    # Writes a placeholder header line and then the offsets; returns the rows
+    file.write(b" " * 255 + b"\n")
+    rows = 0
+    with MappedCSVReader(csv_path) as reader:
+        if reader.data_start is None:
+            raise ValueError(f"{csv_path} ends its lines with a bare \\r; it can't be indexed")
+        end = reader.data_start
+        for starts, ends, next_starts, quotes in reader.iter_blocks():
+            if is_cancelled is not None and is_cancelled():
+                raise OperationCancelled()
+            file.write(starts.astype("<u8").tobytes())
+            rows += len(starts)
+            end = min(int(next_starts[-1]), size)
+            if progress:
+                progress("index", end, size)
+    file.write(np.array([end], dtype="<u8").tobytes())
+    return rows
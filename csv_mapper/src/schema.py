@@ -0,0 +1,167 @@
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from .compiler import CombineOp, FilterOp, FreeformOp, RenameOp, SplitColumnsOp
+
+try:
+    import pyarrow  # noqa: F401
+    STRING_DTYPE = "string[pyarrow]"
+except ImportError:  # Optional: without pyarrow strings stay Python objects
+    STRING_DTYPE = None
+
+
+CATEGORY_MAX_RATIO = 0.5  # Distinct/non-null values at or below this become category
+CATEGORY_MAX_VALUES = 10000  # ...as long as there are no more distinct values than this
+
+SAFE_COMPARISONS = {"==", "!="}  # Work the same on categorical columns
+
+
+class Schema:
+    # Column storage types inferred from a sample and saved with the mapping:
+    #   "integer"  - downcast to the narrowest integer type that fits each chunk
+    #   "category" - low-cardinality strings such as country or status
+    #   "string"   - other strings, Arrow-backed when pyarrow is installed
+    #   "float", "bool" - kept as parsed
+    def __init__(self, dtypes=None):
+        self.dtypes = dict(dtypes or {})
+
+    @classmethod
+    def infer(cls, sample):
+        dtypes = {}
+        for column in sample.columns:
+            kind = _infer_kind(sample[column])
+            if kind is not None:
+                dtypes[column] = kind
+        return cls(dtypes)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data)
+
+    def to_dict(self):
+        return dict(self.dtypes)
+
+    def for_operations(self, operations):
+        # The schema for running `operations`: columns an operation reads in a
+        # way that depends on their type (ordered comparisons, arithmetic in
+        # Code operations...) keep the parser's types. Ordered categories
+        # wouldn't do, as comparing with a value that isn't a category raises.
+        unsafe = untyped_columns(operations)
+        return Schema({
+            column: kind
+            for column, kind in self.dtypes.items()
+            if kind in ("float", "bool") or (unsafe is not None and column not in unsafe)
+        })
+
+    def apply(self, df):
+        # Converts the columns of a parsed chunk (or frame) to the schema's
+        # storage types. Values that don't fit a type are left as parsed.
+        converted = {}
+        for column, kind in self.dtypes.items():
+            if column not in df.columns:
+                continue
+            series = df[column]
+            if kind == "integer" and series.dtype.kind in "iu":
+                converted[column] = pd.to_numeric(series, downcast="integer")
+            elif kind == "category" and series.dtype == object:
+                converted[column] = series.astype("category")
+            elif kind == "string" and STRING_DTYPE and series.dtype == object:
+                try:
+                    converted[column] = series.astype(STRING_DTYPE)
+                except (TypeError, ValueError):
+                    pass  # Mixed-type column: leave it as objects
+        if not converted:
+            return df
+        return df.assign(**converted)
+
+
+def concat_frames(chunks):
+    # pd.concat turns categoricals with different categories into objects;
+    # union the categories first so they stay compact
+    if len(chunks) == 1:
+        return chunks[0]
+    first = chunks[0]
+    for column in first.columns:
+        if isinstance(first[column].dtype, pd.CategoricalDtype) and all(
+            isinstance(chunk[column].dtype, pd.CategoricalDtype) for chunk in chunks
+        ):
+            categories = union_categoricals(
+                [chunk[column] for chunk in chunks], ignore_order=True
+            ).categories
+            chunks = [
+                chunk.assign(**{column: chunk[column].cat.set_categories(categories)})
+                for chunk in chunks
+            ]
+    return pd.concat(chunks, ignore_index=True)
+
+
+def common_dtypes(dtype_maps):
+    # The dtype each column gets when batches parsed separately are
+    # concatenated, as a chunked read does, from each batch's {column: dtype
+    # name}: the parsed dtype when every batch agrees, float64 across integer
+    # and float batches (e.g. one with a missing value), and object otherwise
+    common = {}
+    for dtypes in dtype_maps:
+        for column, dtype in dtypes.items():
+            previous = common.setdefault(column, dtype)
+            if previous == dtype or previous == "object":
+                continue
+            numeric = all(pd.api.types.pandas_dtype(d).kind in "iuf" for d in (previous, dtype))
+            common[column] = "float64" if numeric else "object"
+    return common
+
+
+def untyped_columns(operations):
+    # Input columns that must keep the parser's default types, following
+    # renames back to the input name. None if that can't be determined.
+    origins = {}
+    unsafe = set()
+    for operation in operations:
+        columns = _type_sensitive_columns(operation)
+        if columns is None:
+            return None
+        unsafe.update(origins.get(col, col) for col in columns)
+        if isinstance(operation, RenameOp):
+            renamed = {new: origins.get(old, old) for old, new in operation.mapping.items()}
+            origins.update({old: None for old in operation.mapping})
+            origins.update(renamed)
+        else:
+            origins.update({col: None for col in operation.new_columns})
+    unsafe.discard(None)
+    return unsafe
+
+
+def _type_sensitive_columns(operation):
+    if isinstance(operation, (RenameOp, CombineOp, SplitColumnsOp, FreeformOp)):
+        return []
+    if isinstance(operation, FilterOp) and operation.mask is not None:
+        return _ordered_comparisons(operation.mask.tree)
+    return operation.columns_used  # Anything else may depend on object dtype
+
+
+def _ordered_comparisons(node):
+    if node[0] in ("and", "or", "not"):
+        return [col for child in node[1:] for col in _ordered_comparisons(child)]
+    if node[0] == "compare" and node[2] not in SAFE_COMPARISONS:
+        return [node[1]]
+    return []
+
+
+def _infer_kind(series):
+    dtype = series.dtype
+    if dtype.kind in "iu":
+        return "integer"
+    if dtype.kind == "f":
+        return "float"
+    if dtype.kind == "b":
+        return "bool"
+    if dtype != object:
+        return None
+
+    values = series.dropna()
+    if values.empty or not values.map(type).eq(str).all():
+        return None  # Empty or mixed-type column: leave it to the parser
+    distinct = values.nunique()
+    if distinct <= CATEGORY_MAX_VALUES and distinct <= len(values) * CATEGORY_MAX_RATIO:
+        return "category"
+    return "string"
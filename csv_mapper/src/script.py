@@ -0,0 +1,253 @@
+from .compiler import CombineOp, FilterOp, FreeformOp
+from .schema import untyped_columns
+
+# Generates the standalone script written by MappingUI.export_as_script. The
+# script only needs pandas (pyarrow is used when installed) and streams the
+# input in chunks: it parses only the columns the mapping reads, and drops
+# filtered-out rows from each chunk before any other operation runs. Every
+# chunk gets the column types of a whole-file read, found in a first pass
+# over the file, so its output matches the app's whatever the chunk size.
+# Mappings whose operations look across rows are transformed once all
+# (filtered) chunks are read.
+
+DEFAULT_SCRIPT_CHUNK_ROWS = 100000
+
+SCRIPT_HEADER = '''\
+#!/usr/bin/env python
+# Generated by CSV Mapper{source}.
+#
+#     python {script} INPUT.csv OUTPUT.csv [--chunk-rows ROWS]
+import argparse
+import sys
+import time
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    TEXT = "string[pyarrow]"
+except ImportError:  # Without pyarrow text columns stay Python objects
+    TEXT = "object"
+
+# Operations share unchanged column buffers instead of copying chunks
+pd.set_option("mode.copy_on_write", True)
+
+'''
+
+SCRIPT_HELPERS = '''
+
+def target_columns(columns):
+    # The targeted columns present after the transformations, in target order
+    selected = []
+    for text in TARGETS:
+        if text.startswith("Transformation: "):
+            name = text.split(": ")[1]
+            if name in TRANSFORMATIONS:
+                selected.extend(col for col in columns if col.startswith(name))
+        else:
+            selected.append(text)
+    selected = list(dict.fromkeys(selected))
+    return [col for col in selected if col in columns]
+
+
+def file_dtypes(path, chunk_rows):
+    # The types a whole-file read gives each column. It concatenates batches
+    # parsed separately, so a column is float64 across integer and float
+    # batches (e.g. one with a missing value) and object across any others
+    # (e.g. a text column that is empty throughout one batch).
+    dtypes = {}
+    for chunk in pd.read_csv(path, usecols=USECOLS, chunksize=chunk_rows):
+        for column, dtype in chunk.dtypes.items():
+            dtype = str(dtype)
+            previous = dtypes.setdefault(column, dtype)
+            if previous == dtype or previous == "object":
+                continue
+            numeric = all(pd.api.types.pandas_dtype(d).kind in "iuf" for d in (previous, dtype))
+            dtypes[column] = "float64" if numeric else "object"
+    return dtypes
+
+
+def storage_types(chunk):
+    # The schema's compact types for text columns
+    for column, dtype in DTYPES.items():
+        if column in chunk.columns and chunk[column].dtype == object:
+            try:
+                chunk[column] = chunk[column].astype(dtype)
+            except (TypeError, ValueError):
+                pass  # Mixed-type column: leave it as objects
+    return chunk
+
+
+def read_chunks(path, chunk_rows):
+    # Chunks parsed with the whole file's types, so text stays text in a
+    # chunk where a column only holds numbers or nothing
+    dtypes = file_dtypes(path, chunk_rows)
+    empty = True
+    for chunk in pd.read_csv(path, usecols=USECOLS, dtype=dtypes, chunksize=chunk_rows):
+        empty = False
+        yield storage_types(chunk)
+    if empty:
+        # No rows: still produce the output header
+        yield pd.read_csv(path, usecols=USECOLS, nrows=0)
+'''
+
+VALUES_HELPER = '''
+
+def values(series):
+    # Column values for str.format; missing values render as nan
+    if series.dtype == object:
+        return series.tolist()
+    return series.to_numpy(dtype=object, na_value=float("nan")).tolist()
+'''
+
+JOIN_HELPER = '''
+
+def join_present(separator, *columns):
+    # Joins the values of each row that are not missing
+    rows = zip(*(column.to_numpy(dtype=object, na_value=None) for column in columns))
+    return [separator.join([str(value) for value in row if value is not None]) for row in rows]
+'''
+
+STREAMING_MAIN = '''
+    with open(args.output, "w", newline="") as output:
+        for chunk in read_chunks(args.input, args.chunk_rows):
+            rows_in += len(chunk)
+            df = transform(filter_rows(chunk))
+            df = df[target_columns(list(df.columns))]
+            df.to_csv(output, index=False, header=output.tell() == 0)
+            rows_out += len(df)
+'''
+
+WHOLE_FILE_MAIN = '''
+    # Some operations look across rows, so transform all rows at once
+    chunks = []
+    for chunk in read_chunks(args.input, args.chunk_rows):
+        rows_in += len(chunk)
+        chunks.append(filter_rows(chunk))
+    df = transform(pd.concat(chunks, ignore_index=True))
+    df = df[target_columns(list(df.columns))]
+    df.to_csv(args.output, index=False)
+    rows_out = len(df)
+'''
+
+SCRIPT_MAIN = '''
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply the exported CSV mapping to a file.")
+    parser.add_argument("input", help="input CSV file")
+    parser.add_argument("output", help="output CSV file")
+    parser.add_argument(
+        "--chunk-rows",
+        type=int,
+        default=CHUNK_ROWS,
+        help="rows read per chunk (default: %(default)s)",
+    )
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    rows_in = rows_out = 0
+{body}
+    seconds = time.perf_counter() - start
+    print(f"{{args.output}}: {{rows_in:,}} rows in, {{rows_out:,}} rows out, {{seconds:.2f}}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+'''
+
+
+def generate_script(
+    mapping, header=None, script_name="transform.py", chunk_rows=DEFAULT_SCRIPT_CHUNK_ROWS
+):
+    # Returns the source of a script applying the mapping. header (the input
+    # columns) enables column pruning; without it every column is parsed.
+    leading_filters, remaining = mapping.plan_filters()
+    operations = list(leading_filters) + list(remaining)
+    usecols = mapping.required_columns(header) if header is not None else None
+    if usecols is not None and len(usecols) == len(header):
+        usecols = None
+
+    source = f" from {mapping.source_file}" if mapping.source_file else ""
+    parts = [SCRIPT_HEADER.format(source=source, script=script_name)]
+    parts.append("# Input columns the mapping reads (None parses every column)\n")
+    parts.append(f"USECOLS = {usecols!r}\n")
+    parts.append("# Compact storage types from the mapping's schema\n")
+    parts.append(f"DTYPES = {_dtypes_literal(_script_dtypes(mapping, operations, usecols))}\n")
+    parts.append(f"TARGETS = {list(mapping.mapped_columns)!r}\n")
+    parts.append(f"TRANSFORMATIONS = {list(mapping.transformations)!r}\n")
+    parts.append(f"CHUNK_ROWS = {chunk_rows!r}\n")
+
+    parts.append("\n\ndef filter_rows(df):\n")
+    parts.append("    # Filters that only read input columns run on each chunk as it is read\n")
+    parts.extend(_operation_code(operation) for operation in leading_filters)
+    parts.append("    return df\n")
+
+    parts.append("\n\ndef transform(df):\n")
+    for operation in remaining:
+        parts.append(_operation_code(operation))
+    parts.append("    return df\n")
+
+    parts.append(SCRIPT_HELPERS)
+    if any(isinstance(operation, FreeformOp) for operation in operations):
+        parts.append(VALUES_HELPER)
+    if any(getattr(operation, "null_policy", None) == "skip" for operation in operations):
+        parts.append(JOIN_HELPER)
+    body = STREAMING_MAIN if mapping.is_row_local() else WHOLE_FILE_MAIN
+    parts.append(SCRIPT_MAIN.format(body=body))
+    return "".join(parts)
+
+
+def _operation_code(operation):
+    # One operation as indented statements inside a function taking df
+    if isinstance(operation, FreeformOp):
+        # Render with one positional str.format per row instead of df.apply
+        template = operation.compiled_template
+        if template.columns:
+            columns = ", ".join(f"values(df[{col!r}])" for col in template.columns)
+            value = f"list(map({template.positional!r}.format, {columns}))"
+        else:
+            value = repr(operation.template.format())
+        lines = [f"df[{operation.new_name!r}] = {value}"]
+    elif isinstance(operation, CombineOp):
+        lines = [f"df[{operation.new_name!r}] = {_combine_expression(operation)}"]
+    elif isinstance(operation, FilterOp):
+        lines = [f"df = df[{operation.condition}]"]
+    else:
+        lines = operation.source.strip().split("\n")
+    return "".join(f"    {line}\n" for line in lines)
+
+
+def _combine_expression(operation):
+    first, others = operation.columns[0], operation.columns[1:]
+    if operation.null_policy == "skip":
+        columns = ", ".join(f"df[{col!r}]" for col in operation.columns)
+        return f"join_present({operation.separator!r}, {columns})"
+    na_rep = ", na_rep=''" if operation.null_policy == "empty" else ""
+    others = ", ".join(f"df[{col!r}]" for col in others)
+    return f"df[{first!r}].str.cat([{others}], sep={operation.separator!r}{na_rep})"
+
+
+def _script_dtypes(mapping, operations, usecols):
+    # The schema's text types. Categorical and Arrow-backed text is only used
+    # for columns that every operation reading them handles the same way;
+    # numbers keep the types of a whole-file read.
+    if mapping.schema is None:
+        return {}
+    unsafe = untyped_columns(operations)
+    dtypes = {}
+    for column, kind in mapping.schema.dtypes.items():
+        if usecols is not None and column not in usecols:
+            continue
+        if kind in ("category", "string") and unsafe is not None and column not in unsafe:
+            dtypes[column] = "category" if kind == "category" else "TEXT"
+    return dtypes
+
+
+def _dtypes_literal(dtypes):
+    # TEXT is a name in the generated script, not a string
+    items = ", ".join(
+        f"{column!r}: {'TEXT' if dtype == 'TEXT' else repr(dtype)}"
+        for column, dtype in dtypes.items()
+    )
+    return "{" + items + "}"
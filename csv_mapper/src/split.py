@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # Optional: without it columns are split by pandas
+    pa = pc = None
+
+
+def split_columns(series, delimiter, count):
+    # Splits each value at its first count - 1 delimiters into count columns;
+    # the last column keeps the remainder and missing parts are NA. Returns
+    # the columns as a list of Series.
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Split each distinct value once and expand through the codes
+        codes = series.cat.codes.to_numpy()
+        parts = split_columns(pd.Series(series.cat.categories), delimiter, count)
+        return [
+            pd.Series(part.array.take(codes, allow_fill=True), index=series.index)
+            for part in parts
+        ]
+    if pc is not None:
+        try:
+            return _split_arrow(series, delimiter, count)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            pass  # Not all strings: let pandas handle it
+    parts = series.str.split(delimiter, n=count - 1, expand=True, regex=False)
+    return [
+        parts[i] if i in parts.columns else pd.Series(np.nan, index=series.index, dtype=object)
+        for i in range(count)
+    ]
+
+
+def _split_arrow(series, delimiter, count):
+    # One Arrow kernel call splits every value into a list array; each output
+    # column is then gathered from the flat values through the list offsets
+    array = pa.array(series, from_pandas=True)
+    if isinstance(array, pa.ChunkedArray):
+        array = array.combine_chunks()  # Arrow-backed columns come chunked
+    if array.type not in (pa.string(), pa.large_string()):
+        raise pa.ArrowTypeError(f"cannot split {array.type} values")
+    lists = pc.split_pattern(array, pattern=delimiter, max_splits=count - 1)
+    offsets = lists.offsets.to_numpy()
+    starts, lengths = offsets[:-1], np.diff(offsets)
+    lengths[lists.is_null().to_numpy(zero_copy_only=False)] = 0
+    columns = []
+    for i in range(count):
+        indices = pa.array(starts + i, mask=lengths <= i)  # Null index -> NA part
+        part = lists.values.take(indices)
+        columns.append(pd.Series(pd.arrays.ArrowStringArray(part), index=series.index))
+    return columns
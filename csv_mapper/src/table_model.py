@@ -0,0 +1,51 @@
+from collections import OrderedDict
+
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt
+
+PAGE_ROWS = 1000  # Rows read from the file per page
+CACHED_PAGES = 50  # Most recently viewed pages kept in memory
+
+
+class PagedRowsModel(QAbstractTableModel):
+    # Read-only rows of a CSV for a QTableView. It reports every row of the
+    # file, but a page of rows is only read (one seek through the parser's
+    # row index) when the view first draws one of them, and only the most
+    # recently used pages are kept. Scrolling or jumping anywhere in a
+    # 50M-row file costs one page read.
+    def __init__(self, csv_parser, parent=None):
+        super().__init__(parent)
+        self.csv_parser = csv_parser
+        self.header = csv_parser.get_columns()
+        self.rows = csv_parser.row_count()
+        self._pages = OrderedDict()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.rows
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.header)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        row = self.row(index.row())
+        return row[index.column()] if index.column() < len(row) else None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Vertical:
+            return section + 1  # Row numbers as in a spreadsheet
+        return self.header[section] if section < len(self.header) else None
+
+    def row(self, number):
+        page_number, offset = divmod(number, PAGE_ROWS)
+        page = self._pages.get(page_number)
+        if page is None:
+            page = self.csv_parser.get_rows(page_number * PAGE_ROWS, PAGE_ROWS)
+            self._pages[page_number] = page
+            if len(self._pages) > CACHED_PAGES:
+                self._pages.popitem(last=False)
+        else:
+            self._pages.move_to_end(page_number)
+        return page[offset] if offset < len(page) else ()
@@ -0,0 +1,37 @@
+from .compiler import compile_operation, compile_operations
+
+
+class Transformation:
+    def __init__(self, name):
+        self.name = name
+        self.operations = []
+        self.new_columns = []
+        self._compiled = None
+        self._compiled_key = None
+
+    def add_operation(self, operation):
+        # Compiling up front rejects invalid operations before they are stored
+        compiled = compile_operation(operation)
+        self.operations.append(operation)
+        # Record the new column names produced by the operation
+        for new_col in compiled.new_columns:
+            if new_col not in self.new_columns:
+                self.new_columns.append(new_col)
+
+    def compile(self):
+        # Operations are edited in place by the UI, so recompile when they change
+        key = tuple(self.operations)
+        if self._compiled is None or key != self._compiled_key:
+            self._compiled = compile_operations(key)
+            self._compiled_key = key
+        return self._compiled
+
+    def apply(self, df, profiler=None):
+        # A shallow copy keeps new columns off the caller's frame without
+        # duplicating any data
+        return self.compile().apply(df, profiler, label=self.name)
+
+    def is_row_local(self):
+        # True when every operation maps rows independently, so the data can
+        # be split into chunks and transformed separately
+        return all(operation.row_local for operation in self.compile())
@@ -1,7 +1,4 @@
-import json
 import os
-import sys
-import pandas as pd
 import re
 from PyQt5.QtWidgets import (
     QApplication,
@@ -20,9 +17,32 @@ from PyQt5.QtWidgets import (
     QTextEdit,
     QDialog,
     QDialogButtonBox,
+    QProgressDialog,
+    QSpinBox,
+    QCheckBox,
+    QDockWidget,
+    QTableWidget,
+    QTableWidgetItem,
+    QTableView,
+    QHeaderView,
 )
 from PyQt5.QtCore import Qt
-from .csv_parser import CSVParser
+from PyQt5.QtGui import QFontDatabase
+from .csv_parser import CSVParser, DEFAULT_PREVIEW_ROWS
+from . import pipeline
+from .backends import DEFAULT_BACKEND, available_backends, get_backend
+from .cache import FrameCache
+from .workers import PipelineWorker
+from .compiler import CompileError
+from .filters import translate_condition
+from .mapping import Mapping
+from .profiling import Profiler
+from .schema import Schema
+from .script import generate_script
+from .table_model import PagedRowsModel
+from .transformation import Transformation
+
+PROFILE_COLUMNS = ["Stage", "Step", "Seconds", "Rows in", "Rows out", "Peak memory (MB)"]
 
 
 class FreeformTextDialog(QDialog):
@@ -56,6 +76,70 @@ class FreeformTextDialog(QDialog):
         return self.text_edit.toPlainText()
 
 
+class CombineDialog(QDialog):
+    NULL_POLICIES = {
+        "Leave the result empty": "propagate",
+        "Skip missing values": "skip",
+        "Treat missing values as empty text": "empty",
+    }
+
+    def __init__(self, parent=None, columns=None):
+        super().__init__(parent)
+        self.setWindowTitle("Combine Columns")
+        self.columns = columns or []
+
+        layout = QVBoxLayout(self)
+
+        # Columns are combined in the order they are added
+        layout.addWidget(QLabel("Columns to combine, in order:"))
+        self.selected_list = QListWidget()
+        self.selected_list.setDragDropMode(QListWidget.InternalMove)
+        layout.addWidget(self.selected_list)
+
+        column_layout = QHBoxLayout()
+        for column in self.columns:
+            btn = QPushButton(column)
+            btn.clicked.connect(lambda _, col=column: self.selected_list.addItem(col))
+            column_layout.addWidget(btn)
+        layout.addLayout(column_layout)
+
+        remove_button = QPushButton("Remove Column")
+        remove_button.clicked.connect(
+            lambda: self.selected_list.takeItem(self.selected_list.currentRow())
+        )
+        layout.addWidget(remove_button)
+
+        layout.addWidget(QLabel("Separator:"))
+        self.separator_edit = QLineEdit(" ")
+        layout.addWidget(self.separator_edit)
+
+        layout.addWidget(QLabel("When a value is missing:"))
+        self.null_policy_combo = QComboBox()
+        self.null_policy_combo.addItems(list(self.NULL_POLICIES))
+        layout.addWidget(self.null_policy_combo)
+
+        layout.addWidget(QLabel("New column name:"))
+        self.name_edit = QLineEdit()
+        layout.addWidget(self.name_edit)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+
+    def get_columns(self):
+        return [self.selected_list.item(i).text() for i in range(self.selected_list.count())]
+
+    def get_separator(self):
+        return self.separator_edit.text()
+
+    def get_null_policy(self):
+        return self.NULL_POLICIES[self.null_policy_combo.currentText()]
+
+    def get_name(self):
+        return self.name_edit.text()
+
+
 class FilterDialog(QDialog):
     def __init__(self, parent=None, columns=None):
         super().__init__(parent)
@@ -152,28 +236,8 @@ class FilterDialog(QDialog):
     def get_filter_code(self):
         if not self.conditions:
             return ""
-        return " & ".join(f"({cond})" for cond in self.conditions)
-
-
-class Transformation:
-    def __init__(self, name):
-        self.name = name
-        self.operations = []
-        self.new_columns = []
-
-    def add_operation(self, operation):
-        self.operations.append(operation)
-        # Extract new column names from the operation
-        if "df['" in operation:
-            new_col = operation.split("df['")[1].split("']")[0]
-            if new_col not in self.new_columns:
-                self.new_columns.append(new_col)
-
-    def apply(self, df):
-        result = df.copy()
-        for operation in self.operations:
-            exec(operation)
-        return result
+        # in / contains / startswith / endswith become Series methods
+        return " & ".join(f"({translate_condition(cond)})" for cond in self.conditions)
 
 
 class MappingUI(QMainWindow):
@@ -196,6 +260,25 @@ class MappingUI(QMainWindow):
         self.select_file_button = QPushButton("Select File")
         self.select_file_button.clicked.connect(self.select_file)
         file_layout.addWidget(self.select_file_button)
+        # Mappings are designed against a sample; the full file is read on export
+        self.preview_mode_combo = QComboBox()
+        self.preview_mode_combo.addItems(["First rows", "Random sample", "Full file"])
+        file_layout.addWidget(self.preview_mode_combo)
+        self.preview_rows_input = QSpinBox()
+        self.preview_rows_input.setRange(1, 10000000)
+        self.preview_rows_input.setValue(DEFAULT_PREVIEW_ROWS)
+        self.preview_rows_input.setSuffix(" rows")
+        self.preview_mode_combo.currentTextChanged.connect(
+            lambda mode: self.preview_rows_input.setEnabled(mode != "Full file")
+        )
+        file_layout.addWidget(self.preview_rows_input)
+        self.show_rows_button = QPushButton("Show Rows")
+        self.show_rows_button.setToolTip(
+            "Browse every row of the source; the file is indexed the first time"
+        )
+        self.show_rows_button.setEnabled(False)
+        self.show_rows_button.clicked.connect(self.show_source_rows)
+        file_layout.addWidget(self.show_rows_button)
         main_layout.addLayout(file_layout)
 
         # Mapping layout
@@ -240,6 +323,25 @@ class MappingUI(QMainWindow):
         self.export_button = QPushButton("Export CSV")
         self.export_button.clicked.connect(self.export_csv)
         button_layout.addWidget(self.export_button)
+        self.incremental_checkbox = QCheckBox("Append new rows only")
+        self.incremental_checkbox.setToolTip(
+            "Treat the source as an append-only log: re-exporting to the same file "
+            "only transforms rows added since the last export"
+        )
+        button_layout.addWidget(self.incremental_checkbox)
+        self.profile_checkbox = QCheckBox("Profile export")
+        self.profile_checkbox.setToolTip(
+            "Time each step of the export (read, every operation, write) and show "
+            "its rows in/out and peak memory growth"
+        )
+        button_layout.addWidget(self.profile_checkbox)
+        self.backend_combo = QComboBox()
+        self.backend_combo.addItems(available_backends())
+        self.backend_combo.setToolTip(
+            "Engine that runs the export; Polars streams the whole file on all cores "
+            "and falls back to pandas for operations it can't run"
+        )
+        button_layout.addWidget(self.backend_combo)
         # Save/Load mapping buttons
         self.save_mapping_button = QPushButton("Save Mapping")
         self.save_mapping_button.clicked.connect(self.save_mapping)
@@ -253,16 +355,160 @@ class MappingUI(QMainWindow):
         self.export_script_button.clicked.connect(self.export_as_script)
         button_layout.addWidget(self.export_script_button)
 
+        self.explain_button = QPushButton("Explain Plan")
+        self.explain_button.clicked.connect(self.explain_plan)
+        button_layout.addWidget(self.explain_button)
+
         mapping_layout.addLayout(source_layout)
         mapping_layout.addLayout(transform_layout)
         mapping_layout.addLayout(target_layout)
         mapping_layout.addLayout(button_layout)
         main_layout.addLayout(mapping_layout)
+        self.create_profile_panel()
+        self.create_rows_panel()
 
         self.csv_parser = None
+        self.csv_data = None
+        self.csv_data_is_sample = False  # csv_data holds a preview, not the whole file
+        self.schema = None  # Storage types inferred from a sample of the source
+        self.frame_cache = FrameCache()  # Parsed copies of previously loaded files
+        self.source_path = None
+        self._worker = None
         self.source_column_combo = QComboBox()  # Initialize source_column_combo
         self.mappings = {}
         self.transformations = {}
+        self.profiler = None  # Steps of the last profiled export
+
+    def create_profile_panel(self):
+        # Docked table of the last profiled export, hidden until there is one
+        self.profile_table = QTableWidget(0, len(PROFILE_COLUMNS))
+        self.profile_table.setHorizontalHeaderLabels(PROFILE_COLUMNS)
+        self.profile_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.profile_table.setSortingEnabled(True)
+        self.profile_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
+        self.profile_label = QLabel()
+        save_profile_button = QPushButton("Save as JSON")
+        save_profile_button.clicked.connect(self.save_profile)
+        footer = QHBoxLayout()
+        footer.addWidget(self.profile_label)
+        footer.addStretch()
+        footer.addWidget(save_profile_button)
+
+        panel = QWidget()
+        panel_layout = QVBoxLayout(panel)
+        panel_layout.addWidget(self.profile_table)
+        panel_layout.addLayout(footer)
+        self.profile_dock = QDockWidget("Profile", self)
+        self.profile_dock.setWidget(panel)
+        self.addDockWidget(Qt.BottomDockWidgetArea, self.profile_dock)
+        self.profile_dock.hide()
+
+    def create_rows_panel(self):
+        # Docked view of every row of the source, read a page at a time as it
+        # is scrolled (see PagedRowsModel); hidden until Show Rows is clicked
+        self.rows_view = QTableView()
+        self.rows_view.setEditTriggers(QTableView.NoEditTriggers)
+        self.rows_view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.rows_label = QLabel()
+        self.go_to_row_input = QSpinBox()
+        self.go_to_row_input.setPrefix("Row ")
+        go_to_row_button = QPushButton("Go")
+        go_to_row_button.clicked.connect(self.go_to_row)
+        footer = QHBoxLayout()
+        footer.addWidget(self.rows_label)
+        footer.addStretch()
+        footer.addWidget(self.go_to_row_input)
+        footer.addWidget(go_to_row_button)
+
+        panel = QWidget()
+        panel_layout = QVBoxLayout(panel)
+        panel_layout.addWidget(self.rows_view)
+        panel_layout.addLayout(footer)
+        self.rows_dock = QDockWidget("Source Rows", self)
+        self.rows_dock.setWidget(panel)
+        self.addDockWidget(Qt.BottomDockWidgetArea, self.rows_dock)
+        self.tabifyDockWidget(self.profile_dock, self.rows_dock)
+        self.rows_dock.hide()
+
+    def show_source_rows(self):
+        # The row index takes a pass over the file, so it is only built (or
+        # loaded) when the rows are first asked for, not when the file is loaded
+        csv_parser = self.csv_parser
+        if csv_parser is None:
+            return
+        previous = self.rows_view.model()
+        if previous is not None and previous.csv_parser is csv_parser:
+            self.rows_dock.show()
+            self.rows_dock.raise_()
+            return
+
+        def indexed(_):
+            model = PagedRowsModel(csv_parser, self.rows_view)
+            self.rows_view.setModel(model)
+            if previous is not None:
+                previous.deleteLater()
+            self.go_to_row_input.setRange(1, max(model.rows, 1))
+            self.rows_label.setText(f"{model.rows:,} rows")
+            self.rows_dock.setWindowTitle(f"Source Rows: {os.path.basename(csv_parser.file_path)}")
+            self.rows_dock.show()
+            self.rows_dock.raise_()
+
+        def index_failed(message):
+            QMessageBox.warning(self, "Source Rows", f"Failed to index the rows: {message}")
+
+        self.run_in_background(
+            lambda progress, is_cancelled: csv_parser.row_index(progress, is_cancelled),
+            f"Indexing {os.path.basename(csv_parser.file_path)}...",
+            indexed,
+            index_failed,
+        )
+
+    def go_to_row(self):
+        model = self.rows_view.model()
+        if model is None or not model.rows:
+            return
+        index = model.index(self.go_to_row_input.value() - 1, 0)
+        self.rows_view.scrollTo(index, QTableView.PositionAtTop)
+        self.rows_view.selectRow(index.row())
+
+    def show_profile(self, profiler):
+        self.profiler = profiler
+        table = self.profile_table
+        table.setSortingEnabled(False)  # Sorting while filling scrambles the rows
+        table.setRowCount(len(profiler.records))
+        for row, record in enumerate(profiler.records):
+            values = [
+                record["stage"],
+                record["name"],
+                round(record["seconds"], 3),
+                record["rows_in"],
+                record["rows_out"],
+                _megabytes(record["peak_memory_delta"]),
+            ]
+            for column, value in enumerate(values):
+                item = QTableWidgetItem()
+                if value is not None:
+                    item.setData(Qt.DisplayRole, value)  # Numbers sort numerically
+                table.setItem(row, column, item)
+        table.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)  # Run order
+        table.setSortingEnabled(True)
+        total = profiler.to_dict()["total_seconds"]
+        self.profile_label.setText(f"{len(profiler.records)} steps, {total:.2f}s")
+        self.profile_dock.show()
+        self.profile_dock.raise_()
+
+    def save_profile(self):
+        if self.profiler is None:
+            return
+        profile_path, _ = QFileDialog.getSaveFileName(
+            self, "Save Profile", "", "JSON Files (*.json)"
+        )
+        if not profile_path:
+            return
+        try:
+            self.profiler.save(profile_path)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to save profile: {str(e)}")
 
     def select_file(self):
         file_path, _ = QFileDialog.getOpenFileName(
@@ -271,16 +517,98 @@ class MappingUI(QMainWindow):
         if file_path:
             self.load_csv(file_path)
 
+    def run_in_background(self, task, label, on_success, on_failure):
+        # Runs task(progress, is_cancelled) on a worker thread behind a
+        # cancellable progress dialog so the window stays responsive
+        progress_dialog = QProgressDialog(label, "Cancel", 0, 1000, self)
+        progress_dialog.setWindowTitle("CSV Mapper")
+        progress_dialog.setWindowModality(Qt.WindowModal)
+        progress_dialog.setMinimumDuration(500)
+        progress_dialog.setAutoClose(False)
+        progress_dialog.setAutoReset(False)
+
+        worker = PipelineWorker(task, self)
+        stage_labels = {
+            "read": "Reading CSV",
+            "index": "Indexing rows",
+            "transform": "Applying transformations",
+            "write": "Writing CSV",
+        }
+
+        def update_progress(stage, done, total):
+            if progress_dialog.wasCanceled():
+                return
+            progress_dialog.setLabelText(f"{stage_labels.get(stage, stage)}: {done:,} / {total:,}")
+            progress_dialog.setValue(int(done * 1000 / total) if total else 1000)
+
+        def release():
+            worker.deleteLater()
+            if self._worker is worker:
+                self._worker = None
+
+        worker.progress.connect(update_progress)
+        worker.succeeded.connect(lambda result: (progress_dialog.close(), on_success(result)))
+        worker.failed.connect(lambda message: (progress_dialog.close(), on_failure(message)))
+        worker.cancelled.connect(progress_dialog.close)
+        worker.finished.connect(release)
+        progress_dialog.canceled.connect(worker.cancel)
+
+        self._worker = worker  # Keep a reference until the thread finishes
+        worker.start()
+        return worker
+
     def load_csv(self, file_path):
-        try:
-            self.csv_data = pd.read_csv(file_path)
+        preview_mode = self.preview_mode_combo.currentText()
+        preview_rows = self.preview_rows_input.value()
+        is_sample = preview_mode != "Full file"
+        frame_cache = self.frame_cache
+
+        def load(progress, is_cancelled):
+            # Only the header and a sample are parsed while mappings are designed;
+            # the sample also decides the compact storage types for the full read.
+            # The loaded data keeps the parser's types: operations added later
+            # run on it, and which columns they read by type isn't known yet.
+            csv_parser = CSVParser(file_path, streaming=True)
+            preview = csv_parser.get_preview(preview_rows, sample=preview_mode == "Random sample")
+            schema = Schema.infer(preview)
+            if not is_sample:
+                return pipeline.read_csv(
+                    file_path,
+                    progress=progress,
+                    is_cancelled=is_cancelled,
+                    cache=frame_cache,
+                ), schema, csv_parser
+            return preview, schema, csv_parser
+
+        def loaded(result):
+            csv_data, self.schema, self.csv_parser = result
+            self.csv_data = csv_data
+            self.csv_data_is_sample = is_sample
+            self.source_path = file_path
             self.update_ui_with_csv_data()
+            self.rows_dock.hide()  # Until the new file's rows are asked for
+            self.show_rows_button.setEnabled(True)
             self.file_path_input.setText(file_path)
-            QMessageBox.information(self, "Success", "CSV file loaded successfully.")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to load CSV: {str(e)}")
+            if is_sample:
+                QMessageBox.information(
+                    self,
+                    "Success",
+                    f"CSV preview loaded ({len(csv_data):,} rows). The full file is read on export.",
+                )
+            else:
+                QMessageBox.information(self, "Success", "CSV file loaded successfully.")
+
+        def load_failed(message):
+            QMessageBox.critical(self, "Error", f"Failed to load CSV: {message}")
             self.csv_data = None
 
+        self.run_in_background(
+            load,
+            f"Loading {os.path.basename(file_path)}...",
+            loaded,
+            load_failed,
+        )
+
     def update_ui_with_csv_data(self):
         self.source_column_combo.clear()
         self.source_list.clear()
@@ -378,74 +706,148 @@ class MappingUI(QMainWindow):
         if not export_path:
             return  # User cancelled the file dialog
 
-        try:
-            # Apply the transformations
-            transformed_data = self.apply_transformations()
+        # Snapshot everything the worker needs; it must not touch widgets
+        csv_data = self.csv_data
+        full_file_path = self.source_path if self.csv_data_is_sample else None
+        mapping = self.current_mapping()
+        frame_cache = self.frame_cache
+        incremental_path = self.source_path if self.incremental_checkbox.isChecked() else None
+        profiler = Profiler() if self.profile_checkbox.isChecked() else None
+        backend = self.backend_combo.currentText()
+        source_path = self.source_path
+
+        def export(progress, is_cancelled):
+            if incremental_path:
+                summary = pipeline.export_incremental(
+                    mapping, incremental_path, export_path, progress, is_cancelled, profiler
+                )
+                return summary["missing_columns"], summary
+            if backend != DEFAULT_BACKEND:
+                summary = get_backend(backend).run_mapping(
+                    mapping, source_path, export_path, progress, is_cancelled, profiler
+                )
+                return summary["missing_columns"], summary
+            source_data = csv_data
+            prefiltered = False
+            if full_file_path:
+                # Mappings were designed on a preview; export runs on the whole
+                # file, parsing only the columns the mapping reads and applying
+                # filters to each batch as it is read
+                usecols = pipeline.mapping_usecols(mapping, list(csv_data.columns))
+                leading_filters, _ = mapping.plan_filters()
+                source_data = pipeline.read_csv(
+                    full_file_path,
+                    progress=progress,
+                    is_cancelled=is_cancelled,
+                    usecols=usecols,
+                    row_filter=leading_filters.run,
+                    cache=frame_cache,
+                    schema=mapping.storage_schema(),
+                    profiler=profiler,
+                )
+                prefiltered = True
+
+            # Apply the transformations and select the targeted columns
+            output_data, missing_columns = pipeline.transform_frame(
+                mapping,
+                source_data,
+                progress,
+                is_cancelled,
+                prefiltered=prefiltered,
+                profiler=profiler,
+            )
+            if output_data.empty:
+                return None, None
 
-            if transformed_data.empty:
+            # Export only the transformed and mapped data
+            pipeline.write_csv(
+                output_data,
+                export_path,
+                progress=progress,
+                is_cancelled=is_cancelled,
+                profiler=profiler,
+            )
+            return missing_columns, None
+
+        def exported(result):
+            missing_columns, summary = result
+            if profiler is not None:
+                self.show_profile(profiler)
+            if missing_columns is None:
                 QMessageBox.warning(
                     self, "Warning", "No data to export after applying transformations."
                 )
                 return
+            if missing_columns:
+                QMessageBox.warning(
+                    self,
+                    "Warning",
+                    f"Some targeted columns are missing from the transformed data: {', '.join(missing_columns)}",
+                )
+            details = ""
+            if summary is not None and "mode" in summary:
+                details = {
+                    "append": f" ({summary['rows_out']:,} new rows appended)",
+                    "unchanged": " (no new rows since the last export)",
+                }.get(summary["mode"], " (rebuilt in full)")
+            elif summary is not None and summary.get("fallback"):
+                details = f" (ran on pandas: {summary['fallback']})"
+            QMessageBox.information(
+                self, "Success", f"CSV exported successfully to {export_path}{details}"
+            )
 
-            # Get all columns from the target list
-            targeted_columns = []
-            for item in self.target_list.findItems("*", Qt.MatchWildcard):
-                text = item.text()
-                if text.startswith("Transformation: "):
-                    transform_name = text.split(": ")[1]
-                    if transform_name in self.transformations:
-                        targeted_columns.extend(
-                            [
-                                col
-                                for col in transformed_data.columns
-                                if col.startswith(transform_name)
-                            ]
-                        )
-                else:
-                    targeted_columns.append(text)
-
-            # Remove duplicates while preserving order
-            targeted_columns = list(dict.fromkeys(targeted_columns))
-
-            # Ensure all targeted columns exist in the transformed data
-            existing_columns = [
-                col for col in targeted_columns if col in transformed_data.columns
-            ]
+        self.run_in_background(
+            export,
+            f"Exporting {os.path.basename(export_path)}...",
+            exported,
+            lambda message: QMessageBox.critical(self, "Error", f"Failed to export CSV: {message}"),
+        )
 
-            if len(existing_columns) < len(targeted_columns):
-                missing_columns = set(targeted_columns) - set(existing_columns)
-                missing_columns = [
-                    col
-                    for col in missing_columns
-                    if not col.startswith("Transformation: ")
-                ]
-                if missing_columns:
-                    QMessageBox.warning(
-                        self,
-                        "Warning",
-                        f"Some targeted columns are missing from the transformed data: {', '.join(missing_columns)}",
-                    )
+    def current_mapping(self):
+        return Mapping(
+            source_file=self.file_path_input.text(),
+            mapped_columns=[
+                self.target_list.item(i).text() for i in range(self.target_list.count())
+            ],
+            mappings=dict(self.mappings),
+            transformations=dict(self.transformations),
+            schema=self.schema,
+        )
 
-            # Export only the transformed and mapped data
-            transformed_data[existing_columns].to_csv(export_path, index=False)
-            QMessageBox.information(
-                self, "Success", f"CSV exported successfully to {export_path}"
-            )
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to export CSV: {str(e)}")
+    def mapped_transformations(self):
+        return [
+            transform
+            for transform in self.mappings.values()
+            if isinstance(transform, Transformation)
+        ]
 
-    def apply_transformations(self):
+    def apply_transformations(self, profiler=None):
         if self.csv_data is None:
             raise Exception("No CSV data loaded. Please select a file first.")
 
-        result = self.csv_data.copy()
-
-        for source, transform in self.mappings.items():
-            if isinstance(transform, Transformation):
-                result = transform.apply(result)
+        # All mapped transformations run as one optimized plan
+        return self.current_mapping().plan().run(self.csv_data, profiler)
 
-        return result
+    def explain_plan(self):
+        header = list(self.csv_data.columns) if self.csv_data is not None else None
+        try:
+            text = self.current_mapping().explain(header)
+        except CompileError as e:
+            QMessageBox.warning(self, "Invalid Operation", str(e))
+            return
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Execution Plan")
+        layout = QVBoxLayout(dialog)
+        view = QTextEdit()
+        view.setReadOnly(True)
+        view.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        view.setPlainText(text)
+        layout.addWidget(view)
+        buttons = QDialogButtonBox(QDialogButtonBox.Close)
+        buttons.rejected.connect(dialog.reject)
+        layout.addWidget(buttons)
+        dialog.resize(700, 400)
+        dialog.exec_()
 
     def save_mapping(self):
         if self.target_list.count() == 0:
@@ -456,33 +858,39 @@ class MappingUI(QMainWindow):
             self, "Save Mapping", "", "JSON Files (*.json)"
         )
         if save_path:
-            mapping = {
-                "source_file": self.file_path_input.text(),
-                "mapped_columns": [
-                    self.target_list.item(i).text()
-                    for i in range(self.target_list.count())
-                ],
-            }
-            with open(save_path, "w") as f:
-                json.dump(mapping, f)
+            self.current_mapping().save(save_path)
 
     def load_mapping(self):
         load_path, _ = QFileDialog.getOpenFileName(
             self, "Load Mapping", "", "JSON Files (*.json)"
         )
         if load_path:
-            with open(load_path, "r") as f:
-                mapping = json.load(f)
+            try:
+                mapping = Mapping.load(load_path)
+            except (OSError, ValueError, KeyError) as e:
+                QMessageBox.critical(self, "Error", f"Failed to load mapping: {str(e)}")
+                return
 
-            if mapping["source_file"] != self.file_path_input.text():
+            if mapping.source_file != self.file_path_input.text():
                 # Show a warning that the mapping was created for a different file
                 pass
 
+            # Restore the transformations saved with the mapping (older files have none)
+            for name, transformation in mapping.transformations.items():
+                if name not in self.transformations:
+                    self.source_list.addItem(f"Transformation: {name}")
+                self.transformations[name] = transformation
+            if mapping.mappings:
+                self.mappings = dict(mapping.mappings)
+
+            if mapping.schema is not None:
+                self.schema = mapping.schema
+
             self.target_list.clear()
-            self.target_list.addItems(mapping["mapped_columns"])
+            self.target_list.addItems(mapping.mapped_columns)
 
             # Remove mapped columns from source_list
-            for column in mapping["mapped_columns"]:
+            for column in mapping.mapped_columns:
                 items = self.source_list.findItems(column, Qt.MatchExactly)
                 if items:
                     self.source_list.takeItem(self.source_list.row(items[0]))
@@ -577,64 +985,117 @@ class MappingUI(QMainWindow):
             self, "Add Operation", "Select operation type:", operation_types, 0, False
         )
         if ok:
-            if operation_type == "Freeform Text":
-                dialog = FreeformTextDialog(self, columns=list(self.csv_data.columns))
-                if dialog.exec_():
-                    template = dialog.get_text()
-                    new_column_name, ok = QInputDialog.getText(
-                        self, "New Column", "Enter name for the new column:"
-                    )
-                    if ok:
-                        # Extract placeholders and their corresponding column names
-                        placeholders = re.findall(r'\{([^}]+)\}', template)
-                        operation_code = f"template = '''{template}'''\n"
-                        operation_code += f"df['{new_column_name}'] = df.apply(lambda row: template.format("
-                        format_args = [f"**{{'{p}': row['{p}']}}" for p in placeholders]
-                        operation_code += ", ".join(format_args)
-                        operation_code += "), axis=1)\n"
-                        
-                        transformation.add_operation(operation_code)
-                        operation_list.addItem(f"Freeform Text: {new_column_name}")
-            elif operation_type == "Rename":
-                old_name = self.get_column_selection("Select column to rename")
-                new_name, ok = QInputDialog.getText(
-                    self, "Rename", "Enter new column name:"
+            try:
+                self._add_operation(transformation, operation_list, operation_type)
+            except CompileError as e:
+                QMessageBox.warning(self, "Invalid Operation", str(e))
+
+    def _add_operation(self, transformation, operation_list, operation_type):
+        if operation_type == "Freeform Text":
+            dialog = FreeformTextDialog(self, columns=list(self.csv_data.columns))
+            if dialog.exec_():
+                template = dialog.get_text()
+                new_column_name, ok = QInputDialog.getText(
+                    self, "New Column", "Enter name for the new column:"
                 )
                 if ok:
-                    operation_code = (
-                        f"df = df.rename(columns={{'{old_name}': '{new_name}'}})"
-                    )
+                    # Extract placeholders and their corresponding column names
+                    placeholders = re.findall(r'\{([^}]+)\}', template)
+                    operation_code = f"template = '''{template}'''\n"
+                    operation_code += f"df['{new_column_name}'] = df.apply(lambda row: template.format("
+                    format_args = [f"**{{'{p}': row['{p}']}}" for p in placeholders]
+                    operation_code += ", ".join(format_args)
+                    operation_code += "), axis=1)\n"
+                    
                     transformation.add_operation(operation_code)
-                    operation_list.addItem(f"Rename: {old_name} -> {new_name}")
-            elif operation_type == "Combine":
-                col1 = self.get_column_selection("Select first column to combine")
-                col2 = self.get_column_selection("Select second column to combine")
-                new_name, ok = QInputDialog.getText(
-                    self, "Combine", "Enter new column name:"
+                    operation_list.addItem(f"Freeform Text: {new_column_name}")
+        elif operation_type == "Rename":
+            old_name = self.get_column_selection("Select column to rename")
+            new_name, ok = QInputDialog.getText(
+                self, "Rename", "Enter new column name:"
+            )
+            if ok:
+                operation_code = (
+                    f"df = df.rename(columns={{'{old_name}': '{new_name}'}})"
+                )
+                transformation.add_operation(operation_code)
+                operation_list.addItem(f"Rename: {old_name} -> {new_name}")
+        elif operation_type == "Combine":
+            dialog = CombineDialog(self, columns=list(self.csv_data.columns))
+            if dialog.exec_():
+                columns = dialog.get_columns()
+                separator = dialog.get_separator()
+                null_policy = dialog.get_null_policy()
+                new_name = dialog.get_name()
+                if len(columns) < 2 or not new_name:
+                    QMessageBox.warning(
+                        self, "Warning", "Select at least two columns and a new column name."
+                    )
+                    return
+                if null_policy == "skip":
+                    value = (
+                        f"df[{columns!r}].apply("
+                        f"lambda row: {separator!r}.join(row.dropna().astype(str)), axis=1)"
+                    )
+                else:
+                    others = ", ".join(f"df[{col!r}]" for col in columns[1:])
+                    na_rep = ", na_rep=''" if null_policy == "empty" else ""
+                    value = f"df[{columns[0]!r}].str.cat([{others}], sep={separator!r}{na_rep})"
+                transformation.add_operation(f"df[{new_name!r}] = {value}")
+                operation_list.addItem(f"Combine: {' + '.join(columns)} -> {new_name}")
+        elif operation_type == "Split":
+            col = self.get_column_selection("Select column to split")
+            delimiter, ok = QInputDialog.getText(self, "Split", "Enter delimiter:")
+            if not ok:
+                return
+            mode, ok = QInputDialog.getItem(
+                self,
+                "Split",
+                "Split into:",
+                ["Separate columns", "One list column"],
+                0,
+                False,
+            )
+            if not ok:
+                return
+            if mode == "Separate columns":
+                names, ok = QInputDialog.getText(
+                    self,
+                    "Split",
+                    "Enter the new column names, separated by commas\n"
+                    "(the last column keeps the rest of the value):",
+                    text=f"{col}_1, {col}_2",
                 )
+                new_names = [name.strip() for name in names.split(",") if name.strip()]
+                if ok and len(new_names) < 2:
+                    QMessageBox.warning(
+                        self, "Split", "Enter at least two column names to split into."
+                    )
+                    return
                 if ok:
                     operation_code = (
-                        f"df['{new_name}'] = df['{col1}'] + ' ' + df['{col2}']"
+                        f"df[{new_names!r}] = df[{col!r}].str.split("
+                        f"{delimiter!r}, n={len(new_names) - 1}, expand=True, regex=False"
+                        f").reindex(columns=range({len(new_names)}))"
                     )
                     transformation.add_operation(operation_code)
-                    operation_list.addItem(f"Combine: {col1} + {col2} -> {new_name}")
-            elif operation_type == "Split":
-                col = self.get_column_selection("Select column to split")
-                delimiter, ok = QInputDialog.getText(self, "Split", "Enter delimiter:")
-                if ok:
-                    operation_code = (
-                        f"df['{col}_split'] = df['{col}'].str.split('{delimiter}')"
+                    operation_list.addItem(
+                        f"Split: {col} (delimiter: {delimiter}) -> {', '.join(new_names)}"
                     )
+            else:
+                operation_code = (
+                    f"df['{col}_split'] = df['{col}'].str.split('{delimiter}')"
+                )
+                transformation.add_operation(operation_code)
+                operation_list.addItem(f"Split: {col} (delimiter: {delimiter})")
+        elif operation_type == "Filter":
+            dialog = FilterDialog(self, columns=list(self.csv_data.columns))
+            if dialog.exec_():
+                filter_code = dialog.get_filter_code()
+                if filter_code:
+                    operation_code = f"df = df[{filter_code}]"
                     transformation.add_operation(operation_code)
-                    operation_list.addItem(f"Split: {col} (delimiter: {delimiter})")
-            elif operation_type == "Filter":
-                dialog = FilterDialog(self, columns=list(self.csv_data.columns))
-                if dialog.exec_():
-                    filter_code = dialog.get_filter_code()
-                    if filter_code:
-                        operation_code = f"df = df[{filter_code}]"
-                        transformation.add_operation(operation_code)
-                        operation_list.addItem(f"Filter: {filter_code}")
+                    operation_list.addItem(f"Filter: {filter_code}")
 
     def get_column_selection(self, prompt):
         columns = list(self.csv_data.columns)
@@ -685,58 +1146,35 @@ class MappingUI(QMainWindow):
         if not script_path:
             return
 
+        # Column pruning needs the source header; without a loaded file the
+        # script parses every column
+        header = list(self.csv_data.columns) if self.csv_data is not None else None
         try:
+            script = generate_script(
+                self.current_mapping(), header, script_name=os.path.basename(script_path)
+            )
             with open(script_path, 'w') as script_file:
-                script_file.write("import pandas as pd\n")
-                script_file.write("from config import INPUT_CSV_PATH, OUTPUT_CSV_PATH\n\n")
-                script_file.write("def apply_transformations(df):\n")
-                
-                for source, transform in self.mappings.items():
-                    if isinstance(transform, Transformation):
-                        script_file.write(f"    # Applying transformation: {transform.name}\n")
-                        for operation in transform.operations:
-                            # Ensure proper indentation for each line of the operation
-                            indented_operation = "\n".join("    " + line for line in operation.split("\n"))
-                            script_file.write(f"{indented_operation}\n")
-                        script_file.write("\n")
-
-                # Get the targeted columns
-                targeted_columns = []
-                for item in self.target_list.findItems("*", Qt.MatchWildcard):
-                    text = item.text()
-                    if text.startswith("Transformation: "):
-                        transform_name = text.split(": ")[1]
-                        if transform_name in self.transformations:
-                            for op in self.transformations[transform_name].operations:
-                                if isinstance(op, str) and "df['" in op:
-                                    new_col = op.split("df['")[1].split("']")[0]
-                                    targeted_columns.append(f"'{new_col}'")
-                    else:
-                        targeted_columns.append(f"'{text}'")
-
-                # Remove duplicates while preserving order
-                targeted_columns = list(dict.fromkeys(targeted_columns))
-
-                script_file.write("    # Select only the targeted columns\n")
-                script_file.write(f"    targeted_columns = [{', '.join(targeted_columns)}]\n")
-                script_file.write("    df = df[targeted_columns]\n")
-                script_file.write("    return df\n\n")
-                script_file.write("if __name__ == '__main__':\n")
-                script_file.write("    df = pd.read_csv(INPUT_CSV_PATH)\n")
-                script_file.write("    transformed_df = apply_transformations(df)\n")
-                script_file.write("    transformed_df.to_csv(OUTPUT_CSV_PATH, index=False)\n")
-                script_file.write("    print(f'Transformed CSV saved to {OUTPUT_CSV_PATH}')\n")
+                script_file.write(script)
 
             QMessageBox.information(
                 self, "Success", f"Python script exported successfully to {script_path}"
             )
-            QMessageBox.information(self, "Next Steps", "Please ensure you have a 'config.py' file in the same directory as the exported script with INPUT_CSV_PATH and OUTPUT_CSV_PATH defined.")
+            QMessageBox.information(
+                self,
+                "Next Steps",
+                "Run the script with the input and output paths, e.g.\n"
+                f"python {os.path.basename(script_path)} input.csv output.csv",
+            )
         except Exception as e:
             QMessageBox.critical(
                 self, "Error", f"Failed to export Python script: {str(e)}"
             )
 
 
+def _megabytes(size):
+    return None if size is None else round(size / 2**20, 1)
+
+
 if __name__ == "__main__":
     app = QApplication([])
     window = MappingUI()
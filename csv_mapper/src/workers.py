@@ -0,0 +1,38 @@
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from .pipeline import OperationCancelled
+
+
+class PipelineWorker(QThread):
+    # Runs a pipeline task off the GUI thread. The task is called as
+    # task(progress, is_cancelled) and its return value is emitted on success.
+    progress = pyqtSignal(str, object, object)  # stage, done, total (may exceed 32 bits)
+    succeeded = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+    def __init__(self, task, parent=None):
+        super().__init__(parent)
+        self.task = task
+        self._cancel_requested = False
+
+    def cancel(self):
+        # A plain flag rather than requestInterruption(), which is ignored
+        # until the thread is actually running
+        self._cancel_requested = True
+
+    def is_cancelled(self):
+        return self._cancel_requested
+
+    def report_progress(self, stage, done, total):
+        self.progress.emit(stage, done, total)
+
+    def run(self):
+        try:
+            result = self.task(self.report_progress, self.is_cancelled)
+        except OperationCancelled:
+            self.cancelled.emit()
+        except Exception as e:
+            self.failed.emit(str(e))
+        else:
+            self.succeeded.emit(result)